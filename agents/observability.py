@@ -1,6 +1,10 @@
+from opentelemetry import metrics as metrics_api
 from opentelemetry import trace as trace_api
+from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter
 from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+from opentelemetry.sdk import metrics as metrics_sdk
 from opentelemetry.sdk import trace as trace_sdk
+from opentelemetry.sdk.metrics.export import MetricReader, PeriodicExportingMetricReader
 from opentelemetry.sdk.resources import Resource
 from opentelemetry.sdk.trace.export import SimpleSpanProcessor
 
@@ -13,3 +17,29 @@ def setup_observability(endpoint: str) -> None:
     tracer_provider.add_span_processor(SimpleSpanProcessor(OTLPSpanExporter(endpoint)))
     trace_api.set_tracer_provider(tracer_provider)
     BeeAIInstrumentor().instrument()
+
+
+def setup_metrics(
+    endpoint: str | None = None, prometheus_port: int | None = None
+) -> None:
+    """
+    Set up export of OpenTelemetry metrics - via OTLP to endpoint (e.g.,
+    http://otel-collector:4318/v1/metrics), and/or in Prometheus text format
+    on prometheus_port. (The Prometheus exporter is an optional dependency.)
+    """
+    readers: list[MetricReader] = []
+    if endpoint is not None:
+        readers.append(PeriodicExportingMetricReader(OTLPMetricExporter(endpoint)))
+
+    if prometheus_port is not None:
+        from opentelemetry.exporter.prometheus import PrometheusMetricReader
+        from prometheus_client import start_http_server
+
+        start_http_server(prometheus_port)
+        readers.append(PrometheusMetricReader())
+
+    if readers:
+        meter_provider = metrics_sdk.MeterProvider(
+            resource=Resource(attributes={}), metric_readers=readers
+        )
+        metrics_api.set_meter_provider(meter_provider)
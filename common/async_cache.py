@@ -0,0 +1,166 @@
+"""
+In-process caching of the results of async functions.
+
+Concurrent calls with the same arguments share a single call of the function
+("single flight"). Results are reused until they are max_age old; failures
+are not cached. With stale_while_revalidate, a result that is older than
+max_age (but not by more than stale_while_revalidate) is still returned
+immediately, while a fresh one is fetched in the background - so that,
+for frequently used values, expiry never makes a caller wait.
+"""
+
+import asyncio
+from collections import OrderedDict
+from collections.abc import Callable, Coroutine, Hashable
+from functools import wraps
+import logging
+import time
+from typing import Any, Generic, ParamSpec, TypeVar
+
+logger = logging.getLogger(__name__)
+
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+
+class _Entry(Generic[R]):
+    def __init__(self, task: "asyncio.Task[R]"):
+        self.task = task
+        self.time = time.monotonic()
+        self.refresh_task: "asyncio.Task[R] | None" = None
+
+
+class AsyncCache(Generic[P, R]):
+    """
+    The cache behind an async function decorated with @cache_async().
+    Calling it calls the function, or returns a cached result.
+    """
+
+    def __init__(
+        self,
+        func: Callable[P, Coroutine[Any, Any, R]],
+        *,
+        max_age: float | None,
+        max_entries: int | None = None,
+        stale_while_revalidate: float | None = None,
+    ):
+        self.func = func
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.stale_while_revalidate = stale_while_revalidate
+
+        self._entries: OrderedDict[Hashable, _Entry[R]] = OrderedDict()
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+        wraps(func)(self)
+
+    def _key(self, args: tuple, kwargs: dict) -> Hashable:
+        return (args, frozenset(kwargs.items()))
+
+    def _start(self, key: Hashable, *args: P.args, **kwargs: P.kwargs) -> _Entry[R]:
+        task = asyncio.create_task(self.func(*args, **kwargs))
+        entry = _Entry(task)
+
+        def forget_failure(task: "asyncio.Task[R]"):
+            if task.cancelled() or task.exception() is not None:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+
+        task.add_done_callback(forget_failure)
+
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        if self.max_entries is not None:
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return entry
+
+    def _refresh(self, key: Hashable, entry: _Entry[R], *args, **kwargs) -> None:
+        if entry.refresh_task is not None:
+            return
+
+        entry.refresh_task = refresh_task = asyncio.create_task(
+            self.func(*args, **kwargs)
+        )
+
+        def done(task: "asyncio.Task[R]"):
+            entry.refresh_task = None
+            if task.cancelled():
+                return
+            if task.exception() is not None:
+                logger.warning(
+                    "Failed to refresh %s, keeping the cached result",
+                    self.func.__qualname__,
+                    exc_info=task.exception(),
+                )
+                return
+            if self._entries.get(key) is entry:
+                self._entries[key] = _Entry(refresh_task)
+
+        refresh_task.add_done_callback(done)
+
+    async def __call__(self, *args: P.args, **kwargs: P.kwargs) -> R:
+        # Tasks can't be shared between event loops (for example, in tests)
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._entries.clear()
+            self._loop = loop
+
+        key = self._key(args, kwargs)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._start(key, *args, **kwargs)
+        else:
+            self._entries.move_to_end(key)
+            age = time.monotonic() - entry.time
+            # A call that is still in progress is never too old to wait for
+            if self.max_age is not None and age > self.max_age and entry.task.done():
+                if (
+                    self.stale_while_revalidate is not None
+                    and age <= self.max_age + self.stale_while_revalidate
+                ):
+                    self._refresh(key, entry, *args, **kwargs)
+                else:
+                    entry = self._start(key, *args, **kwargs)
+
+        # Shielded, so that one caller being cancelled doesn't affect the others
+        return await asyncio.shield(entry.task)
+
+    def cache_clear(self) -> None:
+        """Forget all cached results."""
+        self._entries.clear()
+
+
+def cache_async(
+    *,
+    max_age: float | None,
+    max_entries: int | None = None,
+    stale_while_revalidate: float | None = None,
+) -> Callable[[Callable[P, Coroutine[Any, Any, R]]], AsyncCache[P, R]]:
+    """
+    Decorator to cache the results of an async function, keyed by its
+    (hashable) arguments.
+
+    Args:
+        max_age: The maximum age (in seconds) for which a cached result is
+            valid, or None to keep results forever.
+        max_entries: The maximum number of results to keep; the least
+            recently used results are evicted first.
+        stale_while_revalidate: For how long (in seconds) after max_age
+            a cached result is still returned, while it is refreshed in
+            the background.
+    Returns:
+        A decorator that wraps the function in an AsyncCache.
+    """
+
+    def decorator(func: Callable[P, Coroutine[Any, Any, R]]) -> AsyncCache[P, R]:
+        return AsyncCache(
+            func,
+            max_age=max_age,
+            max_entries=max_entries,
+            stale_while_revalidate=stale_while_revalidate,
+        )
+
+    return decorator
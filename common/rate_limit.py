@@ -0,0 +1,420 @@
+"""
+Rate limiting for the upstream services we call (Jira, Errata Tool, GitLab, Copr).
+
+Each upstream has a token bucket. When REDIS_URL is set, the buckets live in
+Redis, so that all processes (supervisor, agents, MCP gateway, fetcher) share
+them; otherwise, or if Redis can't be reached, each process limits itself.
+A 429 (or 503) response with a Retry-After header pauses all requests to that
+upstream until the given time.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import cache
+import logging
+import os
+import time
+from typing import AsyncGenerator, NamedTuple
+from urllib.parse import urlparse
+from weakref import WeakKeyDictionary
+
+import aiohttp
+import redis
+import redis.asyncio as aredis
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimit(NamedTuple):
+    rate: float  # requests per second
+    burst: int  # maximum number of requests that can be made at once
+
+
+RATE_LIMITS: dict[str, RateLimit] = {
+    # https://spaces.redhat.com/spaces/JiraAid/pages/553618479/Optimizing+scripts+that+make+API+calls
+    "jira": RateLimit(rate=5, burst=10),
+    "errata": RateLimit(rate=5, burst=10),
+    "gitlab": RateLimit(rate=10, burst=20),
+    "copr": RateLimit(rate=5, burst=10),
+}
+
+# Used when a 429 response doesn't say how long to wait
+DEFAULT_RETRY_AFTER = 5.0  # seconds
+
+RATE_LIMIT_KEY_PREFIX = "rate_limit:"
+
+# KEYS: bucket, blocked-until; ARGV: rate, burst
+# Returns the number of seconds to wait before trying again, or 0 if
+# a token was taken. (As a string, since Lua numbers are converted to integers.)
+ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+
+local blocked_until = tonumber(redis.call('GET', KEYS[2]) or '0')
+if blocked_until > now then
+    return tostring(blocked_until - now)
+end
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or burst
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+-- After this long, the bucket is full again, so we don't need to keep it
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+# KEYS: blocked-until; ARGV: seconds
+RETRY_AFTER_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local seconds = tonumber(ARGV[1])
+local blocked_until = tonumber(redis.call('GET', KEYS[1]) or '0')
+if now + seconds > blocked_until then
+    redis.call('SET', KEYS[1], tostring(now + seconds), 'PX', math.ceil(seconds * 1000))
+end
+"""
+
+
+def upstream_for_url(url: str) -> str | None:
+    """
+    Returns the name of the upstream (a key of RATE_LIMITS) that url belongs to,
+    or None if requests to it aren't rate limited.
+    """
+    host = urlparse(str(url)).hostname or ""
+    jira_url = os.environ.get("JIRA_URL")
+    if host == "issues.redhat.com" or (
+        jira_url and host == urlparse(jira_url).hostname
+    ):
+        return "jira"
+
+    labels = host.split(".")
+    for upstream in ("errata", "gitlab", "copr"):
+        if upstream in labels:
+            return upstream
+
+    return None
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Parses the value of a Retry-After header (a number of seconds or an HTTP date)
+    into a number of seconds from now.
+    """
+    if value is None:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+
+    return max(0.0, (retry_at - datetime.now(tz=timezone.utc)).total_seconds())
+
+
+def retry_after_for_response(status: int, retry_after: str | None) -> float | None:
+    """
+    Returns how long requests to an upstream should be paused after a response
+    with the given status and Retry-After header, if at all.
+    """
+    if status not in (429, 503):
+        return None
+
+    seconds = parse_retry_after(retry_after)
+    if seconds is None and status == 429:
+        seconds = DEFAULT_RETRY_AFTER
+
+    return seconds
+
+
+class _LocalBucket:
+    """In-process token bucket, used when Redis isn't available"""
+
+    def __init__(self, limit: RateLimit):
+        self.limit = limit
+        self.tokens = float(limit.burst)
+        self.ts = time.monotonic()
+        self.blocked_until = 0.0
+
+    def take(self) -> float:
+        now = time.monotonic()
+        if self.blocked_until > now:
+            return self.blocked_until - now
+
+        self.tokens = min(
+            self.limit.burst, self.tokens + (now - self.ts) * self.limit.rate
+        )
+        self.ts = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        else:
+            return (1 - self.tokens) / self.limit.rate
+
+    def block(self, seconds: float) -> None:
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class _RateLimiterBase:
+    def __init__(self, limits: dict[str, RateLimit]):
+        self.limits = limits
+        self.local_buckets: dict[str, _LocalBucket] = {}
+
+    def _keys(self, upstream: str) -> list[str]:
+        prefix = f"{RATE_LIMIT_KEY_PREFIX}{upstream}"
+        return [f"{prefix}:bucket", f"{prefix}:blocked_until"]
+
+    def _local_bucket(self, upstream: str) -> _LocalBucket:
+        if upstream not in self.local_buckets:
+            self.local_buckets[upstream] = _LocalBucket(self.limits[upstream])
+        return self.local_buckets[upstream]
+
+    def _redis_failed(self, upstream: str) -> None:
+        logger.warning(
+            "Rate limiting for %s falling back to this process only",
+            upstream,
+            exc_info=True,
+        )
+
+
+class RateLimiter(_RateLimiterBase):
+    """
+    Rate limiter for async code. Use trace_config() to apply it to
+    all the requests made by an aiohttp.ClientSession.
+    """
+
+    def __init__(
+        self,
+        client: aredis.Redis | None,
+        limits: dict[str, RateLimit] = RATE_LIMITS,
+    ):
+        super().__init__(limits)
+        self.client = client
+        if client is not None:
+            self.acquire_script = client.register_script(ACQUIRE_SCRIPT)
+            self.retry_after_script = client.register_script(RETRY_AFTER_SCRIPT)
+
+    async def _try_acquire(self, upstream: str) -> float:
+        if self.client is not None:
+            limit = self.limits[upstream]
+            try:
+                return float(
+                    await self.acquire_script(
+                        keys=self._keys(upstream), args=[limit.rate, limit.burst]
+                    )
+                )
+            except redis.RedisError:
+                self._redis_failed(upstream)
+
+        return self._local_bucket(upstream).take()
+
+    async def acquire(self, upstream: str) -> None:
+        """Waits until a request can be made to upstream"""
+        if upstream not in self.limits:
+            return
+
+        while (wait := await self._try_acquire(upstream)) > 0:
+            logger.debug("Rate limiting %s: waiting %.3f seconds", upstream, wait)
+            await asyncio.sleep(wait)
+
+    async def retry_after(self, upstream: str, seconds: float) -> None:
+        """Pauses requests to upstream for the next seconds seconds"""
+        if upstream not in self.limits:
+            return
+
+        logger.warning("%s asked us to back off for %.1f seconds", upstream, seconds)
+        if self.client is not None:
+            try:
+                await self.retry_after_script(
+                    keys=self._keys(upstream)[1:], args=[seconds]
+                )
+                return
+            except redis.RedisError:
+                self._redis_failed(upstream)
+
+        self._local_bucket(upstream).block(seconds)
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        async def on_request_start(session, context, params):
+            upstream = upstream_for_url(str(params.url))
+            if upstream is not None:
+                await self.acquire(upstream)
+
+        async def on_request_end(session, context, params):
+            upstream = upstream_for_url(str(params.url))
+            seconds = retry_after_for_response(
+                params.response.status, params.response.headers.get("Retry-After")
+            )
+            if upstream is not None and seconds is not None:
+                await self.retry_after(upstream, seconds)
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        return trace_config
+
+
+class SyncRateLimiter(_RateLimiterBase):
+    """
+    Rate limiter for synchronous code. Use adapter() to apply it to
+    all the requests made by a requests.Session.
+    """
+
+    def __init__(
+        self,
+        client: redis.Redis | None,
+        limits: dict[str, RateLimit] = RATE_LIMITS,
+    ):
+        super().__init__(limits)
+        self.client = client
+        if client is not None:
+            self.acquire_script = client.register_script(ACQUIRE_SCRIPT)
+            self.retry_after_script = client.register_script(RETRY_AFTER_SCRIPT)
+
+    @classmethod
+    def from_env(cls) -> "SyncRateLimiter":
+        """Creates a rate limiter sharing its state through $REDIS_URL, if set"""
+        redis_url = os.environ.get("REDIS_URL")
+        return cls(redis.Redis.from_url(redis_url) if redis_url else None)
+
+    def _try_acquire(self, upstream: str) -> float:
+        if self.client is not None:
+            limit = self.limits[upstream]
+            try:
+                return float(
+                    self.acquire_script(
+                        keys=self._keys(upstream), args=[limit.rate, limit.burst]
+                    )
+                )
+            except redis.RedisError:
+                self._redis_failed(upstream)
+
+        return self._local_bucket(upstream).take()
+
+    def acquire(self, upstream: str) -> None:
+        """Waits until a request can be made to upstream"""
+        if upstream not in self.limits:
+            return
+
+        while (wait := self._try_acquire(upstream)) > 0:
+            logger.debug("Rate limiting %s: waiting %.3f seconds", upstream, wait)
+            time.sleep(wait)
+
+    def retry_after(self, upstream: str, seconds: float) -> None:
+        """Pauses requests to upstream for the next seconds seconds"""
+        if upstream not in self.limits:
+            return
+
+        logger.warning("%s asked us to back off for %.1f seconds", upstream, seconds)
+        if self.client is not None:
+            try:
+                self.retry_after_script(keys=self._keys(upstream)[1:], args=[seconds])
+                return
+            except redis.RedisError:
+                self._redis_failed(upstream)
+
+        self._local_bucket(upstream).block(seconds)
+
+    def adapter(self) -> HTTPAdapter:
+        return RateLimitedAdapter(self)
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """A requests transport adapter that applies a SyncRateLimiter"""
+
+    def __init__(self, limiter: SyncRateLimiter, **kwargs):
+        super().__init__(**kwargs)
+        self.limiter = limiter
+
+    def send(self, request, *args, **kwargs) -> requests.Response:
+        upstream = upstream_for_url(request.url)
+        if upstream is not None:
+            self.limiter.acquire(upstream)
+
+        response = super().send(request, *args, **kwargs)
+
+        seconds = retry_after_for_response(
+            response.status_code, response.headers.get("Retry-After")
+        )
+        if upstream is not None and seconds is not None:
+            self.limiter.retry_after(upstream, seconds)
+
+        return response
+
+
+# Limiters that are shared by everything in the process, so that we don't
+# set up a Redis connection for every session or call. An asyncio Redis client
+# can only be used from the event loop it was created in, so there's one
+# RateLimiter per event loop.
+_shared_rate_limiters = WeakKeyDictionary[asyncio.AbstractEventLoop, RateLimiter]()
+
+
+def shared_rate_limiter() -> RateLimiter:
+    """
+    Gets the process-wide RateLimiter (for the running event loop), sharing
+    its state through $REDIS_URL, if set.
+    """
+    loop = asyncio.get_running_loop()
+    limiter = _shared_rate_limiters.get(loop)
+    if limiter is None:
+        redis_url = os.environ.get("REDIS_URL")
+        client = aredis.Redis.from_url(redis_url) if redis_url else None
+        limiter = _shared_rate_limiters[loop] = RateLimiter(client)
+
+    return limiter
+
+
+@cache
+def shared_sync_rate_limiter() -> SyncRateLimiter:
+    """Gets the process-wide SyncRateLimiter; see SyncRateLimiter.from_env()"""
+    return SyncRateLimiter.from_env()
+
+
+@asynccontextmanager
+async def rate_limiter_from_env() -> AsyncGenerator[RateLimiter, None]:
+    """
+    Creates a RateLimiter sharing its state through $REDIS_URL, if set.
+    (Unlike common.utils.redis_client(), this doesn't fail if Redis is down.)
+    """
+    redis_url = os.environ.get("REDIS_URL")
+    client = aredis.Redis.from_url(redis_url) if redis_url else None
+    try:
+        yield RateLimiter(client)
+    finally:
+        if client is not None:
+            await client.aclose()
+
+
+@asynccontextmanager
+async def rate_limited_session(**kwargs) -> AsyncGenerator[aiohttp.ClientSession, None]:
+    """
+    Creates an aiohttp.ClientSession (passing through kwargs) whose requests
+    are rate limited by the shared_rate_limiter().
+    """
+    limiter = shared_rate_limiter()
+    async with aiohttp.ClientSession(
+        trace_configs=[limiter.trace_config()], **kwargs
+    ) as session:
+        yield session
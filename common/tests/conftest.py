@@ -0,0 +1,42 @@
+from types import SimpleNamespace
+
+import pytest
+
+
+class FakeClock:
+    """
+    A fake monotonic clock, advanced by calling advance(), or by the
+    (fake) asyncio.sleep() of the module it is installed in
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps: list[float] = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+    async def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.advance(seconds)
+
+
+@pytest.fixture
+def fake_clock(monkeypatch):
+    """
+    Returns a function that installs a FakeClock in a module. Only the module's
+    own time (and with patch_sleep, asyncio) is replaced, since the event loop
+    needs the real clock.
+    """
+
+    def install(module, patch_sleep: bool = False) -> FakeClock:
+        clock = FakeClock()
+        monkeypatch.setattr(module, "time", SimpleNamespace(monotonic=clock.monotonic))
+        if patch_sleep:
+            monkeypatch.setattr(module, "asyncio", SimpleNamespace(sleep=clock.sleep))
+        return clock
+
+    return install
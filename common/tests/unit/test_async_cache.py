@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+import common.async_cache
+from common.async_cache import cache_async
+
+
+@pytest.fixture
+def clock(fake_clock):
+    return fake_clock(common.async_cache)
+
+
+def counting():
+    """An async function that returns its arguments and how often it was called"""
+    calls = []
+
+    async def func(*args):
+        calls.append(args)
+        await asyncio.sleep(0)
+        return (args, len(calls))
+
+    return func, calls
+
+
+@pytest.mark.asyncio
+async def test_keyed(clock):
+    func, calls = counting()
+    cached = cache_async(max_age=60)(func)
+
+    assert await cached("a") == (("a",), 1)
+    assert await cached("b") == (("b",), 2)
+    assert await cached("a") == (("a",), 1)
+    assert calls == [("a",), ("b",)]
+
+
+@pytest.mark.asyncio
+async def test_single_flight(clock):
+    func, calls = counting()
+    cached = cache_async(max_age=60)(func)
+
+    results = await asyncio.gather(*(cached("a") for _ in range(5)))
+    assert results == [(("a",), 1)] * 5
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_max_age(clock):
+    func, calls = counting()
+    cached = cache_async(max_age=60)(func)
+
+    await cached("a")
+    clock.advance(30)
+    await cached("a")
+    assert len(calls) == 1
+
+    clock.advance(31)
+    assert await cached("a") == (("a",), 2)
+
+
+@pytest.mark.asyncio
+async def test_failures_not_cached(clock):
+    failures = [RuntimeError("boom")]
+
+    async def fetch(key):
+        if failures:
+            raise failures.pop()
+        return key
+
+    cached = cache_async(max_age=60)(fetch)
+    with pytest.raises(RuntimeError):
+        await cached("a")
+    assert await cached("a") == "a"
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction(clock):
+    func, calls = counting()
+    cached = cache_async(max_age=None, max_entries=2)(func)
+
+    await cached("a")
+    await cached("b")
+    await cached("a")  # "b" is now the least recently used
+    await cached("c")
+    assert len(calls) == 3
+
+    await cached("a")
+    assert len(calls) == 3
+    await cached("b")
+    assert len(calls) == 4
+
+
+@pytest.mark.asyncio
+async def test_stale_while_revalidate(clock):
+    func, calls = counting()
+    cached = cache_async(max_age=60, stale_while_revalidate=600)(func)
+
+    await cached("a")
+    clock.advance(120)
+
+    # The stale result is returned immediately, and refreshed in the background
+    assert await cached("a") == (("a",), 1)
+    assert await cached("a") == (("a",), 1)
+    await asyncio.sleep(0.01)
+    assert len(calls) == 2
+    assert await cached("a") == (("a",), 2)
+
+    # Beyond stale_while_revalidate, callers wait for a fresh result
+    clock.advance(1000)
+    assert await cached("a") == (("a",), 3)
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_keeps_stale_result(clock):
+    values = ["old"]
+
+    async def fetch():
+        if not values:
+            raise RuntimeError("boom")
+        return values.pop()
+
+    cached = cache_async(max_age=60, stale_while_revalidate=600)(fetch)
+    assert await cached() == "old"
+
+    clock.advance(120)
+    assert await cached() == "old"
+    await asyncio.sleep(0.01)
+    assert await cached() == "old"
@@ -0,0 +1,169 @@
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+import redis
+from flexmock import flexmock
+
+import common.rate_limit
+from common.rate_limit import (
+    DEFAULT_RETRY_AFTER,
+    RateLimit,
+    RateLimiter,
+    SyncRateLimiter,
+    parse_retry_after,
+    retry_after_for_response,
+    upstream_for_url,
+)
+
+
+@pytest.fixture
+def clock(fake_clock):
+    return fake_clock(common.rate_limit, patch_sleep=True)
+
+
+@pytest.mark.parametrize(
+    "url, upstream",
+    [
+        ("https://jira.example.com/rest/api/2/search", "jira"),
+        ("https://issues.redhat.com/rest/api/2/field", "jira"),
+        ("https://errata.engineering.redhat.com/api/v1/erratum/1", "errata"),
+        ("https://gitlab.com/api/v4/projects", "gitlab"),
+        ("https://copr.devel.redhat.com/api_3/build/1", "copr"),
+        ("https://example.com/", None),
+    ],
+)
+def test_upstream_for_url(monkeypatch, url, upstream):
+    monkeypatch.setenv("JIRA_URL", "https://jira.example.com")
+    assert upstream_for_url(url) == upstream
+
+
+def test_parse_retry_after():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("120") == 120.0
+    assert parse_retry_after("-1") == 0.0
+    assert parse_retry_after("soon") is None
+
+    retry_at = datetime.now(tz=timezone.utc) + timedelta(minutes=1)
+    assert 50 < parse_retry_after(format_datetime(retry_at, usegmt=True)) <= 60
+
+
+def test_retry_after_for_response():
+    assert retry_after_for_response(200, "10") is None
+    assert retry_after_for_response(429, "10") == 10.0
+    assert retry_after_for_response(429, None) == DEFAULT_RETRY_AFTER
+    assert retry_after_for_response(503, "10") == 10.0
+    assert retry_after_for_response(503, None) is None
+
+
+@pytest.mark.asyncio
+async def test_local_rate_limit(clock):
+    limiter = RateLimiter(None, {"jira": RateLimit(rate=10, burst=2)})
+
+    # The burst is available immediately
+    await limiter.acquire("jira")
+    await limiter.acquire("jira")
+    assert clock.sleeps == []
+
+    # Then we wait for the bucket to refill
+    await limiter.acquire("jira")
+    assert clock.sleeps == [pytest.approx(0.1)]
+
+    # Upstreams without a limit are not limited
+    for _ in range(10):
+        await limiter.acquire("other")
+    assert len(clock.sleeps) == 1
+
+
+@pytest.mark.asyncio
+async def test_local_retry_after(clock):
+    limiter = RateLimiter(None, {"jira": RateLimit(rate=10, burst=2)})
+
+    await limiter.retry_after("jira", 30)
+    await limiter.acquire("jira")
+    assert clock.sleeps == [pytest.approx(30)]
+
+
+@pytest.mark.asyncio
+async def test_redis_rate_limit(clock):
+    waits = ["0", "0.25", "0"]
+
+    async def acquire_script(keys, args):
+        assert keys == ["rate_limit:jira:bucket", "rate_limit:jira:blocked_until"]
+        assert args == [10, 2]
+        return waits.pop(0)
+
+    client = flexmock()
+    client.should_receive("register_script").and_return(acquire_script)
+
+    limiter = RateLimiter(client, {"jira": RateLimit(rate=10, burst=2)})
+    await limiter.acquire("jira")
+    await limiter.acquire("jira")
+
+    assert clock.sleeps == [0.25]
+    assert waits == []
+
+
+@pytest.mark.asyncio
+async def test_redis_failure_falls_back_to_local(clock):
+    async def failing_script(keys, args):
+        raise redis.ConnectionError("Connection refused")
+
+    client = flexmock()
+    client.should_receive("register_script").and_return(failing_script)
+
+    limiter = RateLimiter(client, {"jira": RateLimit(rate=10, burst=1)})
+    await limiter.retry_after("jira", 5)
+    await limiter.acquire("jira")
+
+    assert clock.sleeps == [pytest.approx(5)]
+
+
+# The Lua scripts use the Redis server's clock, so these tests wait for real
+
+
+@pytest.fixture
+def fakeredis():
+    """The fakeredis module, skipping the test unless it can run Lua scripts"""
+    pytest.importorskip("lupa")
+    return pytest.importorskip("fakeredis")
+
+
+@pytest.mark.asyncio
+async def test_acquire_script(fakeredis):
+    limiter = RateLimiter(
+        fakeredis.aioredis.FakeRedis(), {"jira": RateLimit(rate=20, burst=2)}
+    )
+
+    start = time.monotonic()
+    await limiter.acquire("jira")
+    await limiter.acquire("jira")
+    assert time.monotonic() - start < 0.04
+
+    # The bucket is empty, so we wait for a token (1/20 second)
+    await limiter.acquire("jira")
+    assert time.monotonic() - start >= 0.04
+
+
+@pytest.mark.asyncio
+async def test_retry_after_script(fakeredis):
+    limiter = RateLimiter(
+        fakeredis.aioredis.FakeRedis(), {"jira": RateLimit(rate=20, burst=2)}
+    )
+
+    start = time.monotonic()
+    await limiter.retry_after("jira", 0.2)
+    await limiter.acquire("jira")
+    assert time.monotonic() - start >= 0.15
+
+
+def test_sync_acquire_script(fakeredis):
+    client = fakeredis.FakeRedis()
+    limiter = SyncRateLimiter(client, {"jira": RateLimit(rate=20, burst=1)})
+
+    start = time.monotonic()
+    limiter.acquire("jira")
+    limiter.acquire("jira")
+    assert time.monotonic() - start >= 0.04
+    assert client.exists("rate_limit:jira:bucket")
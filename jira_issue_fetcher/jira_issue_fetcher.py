@@ -9,7 +9,7 @@ Follows Jira API best practices:
 https://spaces.redhat.com/spaces/JiraAid/pages/553618479/Optimizing+scripts+that+make+API+calls
 
 - Pagination for large datasets
-- Rate limiting (5 calls per second)
+- Rate limiting (5 calls per second, shared with other services through Redis)
 - Exponential backoff for retries
 - Proper error handling and logging
 - Optimized API calls with field filtering
@@ -41,6 +41,11 @@ from common.models import (
     NoActionData,
     ErrorData
 )
+from common.rate_limit import (
+    RateLimiter,
+    rate_limiter_from_env,
+    retry_after_for_response,
+)
 from common.utils import redis_client, fix_await
 from common.constants import JiraLabels, RedisQueues
 
@@ -81,6 +86,10 @@ class JiraIssueFetcher:
 
         # Rate limiting
         self.last_request_time = 0.0
+        # Shared with the other services calling Jira, set up in run()
+        self.rate_limiter: RateLimiter | None = None
+        # Retry-After from the last 429 response, passed on to rate_limiter
+        self.retry_after: float | None = None
 
     async def _rate_limit(self):
         """Enforce rate limiting of RATE_LIMIT_CALLS_PER_SECOND calls per second"""
@@ -92,6 +101,12 @@ class JiraIssueFetcher:
             logger.debug(f"Rate limiting: sleeping for {sleep_time:.3f} seconds")
             await asyncio.sleep(sleep_time)
 
+        if self.rate_limiter is not None:
+            if self.retry_after is not None:
+                await self.rate_limiter.retry_after("jira", self.retry_after)
+                self.retry_after = None
+            await self.rate_limiter.acquire("jira")
+
         self.last_request_time = time.time()
 
     @backoff.on_exception(
@@ -115,6 +130,9 @@ class JiraIssueFetcher:
         # Handle rate limiting specifically
         if response.status_code == 429:
             logger.warning("Rate limited (429), will retry with backoff")
+            self.retry_after = retry_after_for_response(
+                response.status_code, response.headers.get("Retry-After")
+            )
             raise requests.HTTPError("Rate limited", response=response)
 
         response.raise_for_status()
@@ -329,7 +347,8 @@ class JiraIssueFetcher:
         try:
             logger.info("Starting Jira issue fetcher")
 
-            issues = await self.search_issues()
+            async with rate_limiter_from_env() as self.rate_limiter:
+                issues = await self.search_issues()
 
             if not issues:
                 logger.info("No issues found matching the query")
@@ -77,6 +77,24 @@ async def test_rate_limit(fetcher):
     # Should have updated last_request_time
     assert fetcher.last_request_time == 0.2
 
+@pytest.mark.asyncio
+async def test_rate_limit_shared(fetcher):
+    """Test that the shared rate limiter is used and told about Retry-After."""
+    calls = []
+
+    async def acquire(upstream):
+        calls.append(("acquire", upstream))
+
+    async def retry_after(upstream, seconds):
+        calls.append(("retry_after", upstream, seconds))
+
+    fetcher.rate_limiter = flexmock(acquire=acquire, retry_after=retry_after)
+    fetcher.retry_after = 30.0
+    await fetcher._rate_limit()
+
+    assert calls == [("retry_after", "jira", 30.0), ("acquire", "jira")]
+    assert fetcher.retry_after is None
+
 def test_make_request_with_retries_success(fetcher):
     """Test successful HTTP request."""
     mock_response = flexmock()
@@ -102,6 +120,7 @@ def test_make_request_with_retries_rate_limited(fetcher):
     """Test HTTP request with rate limiting (429 error)."""
     mock_response = flexmock()
     mock_response.status_code = 429
+    mock_response.headers = {"Retry-After": "30"}
 
     flexmock(requests).should_receive('post').and_return(mock_response)
     flexmock(requests.HTTPError)
@@ -117,6 +136,9 @@ def test_make_request_with_retries_rate_limited(fetcher):
             {'jql': 'test query'}
         )
 
+    # Passed on to the shared rate limiter before the next request
+    assert fetcher.retry_after == 30.0
+
 @pytest.mark.asyncio
 async def test_search_issues_single_page(fetcher):
     """Test searching issues with single page result."""
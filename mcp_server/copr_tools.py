@@ -13,6 +13,7 @@ from copr.v3 import BuildProxy, ProjectProxy
 from fastmcp.exceptions import ToolError
 from pydantic import BaseModel, Field
 
+from common.rate_limit import rate_limited_session
 from common.utils import init_kerberos_ticket, KerberosError
 from common.validators import AbsolutePath
 
@@ -180,7 +181,7 @@ async def download_artifacts(
     for example `http://example.com/builder-live.log.gz` will be downloaded as `builder-live.log`.
     """
     timeout = aiohttp.ClientTimeout(total=30)
-    async with aiohttp.ClientSession(timeout=timeout) as session:
+    async with rate_limited_session(timeout=timeout) as session:
         for url in artifacts_urls:
             try:
                 async with session.get(url) as response:
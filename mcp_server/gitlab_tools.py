@@ -11,6 +11,7 @@ from ogr.exceptions import OgrException, GitlabAPIException
 from ogr.services.gitlab.project import GitlabProject
 from pydantic import Field
 
+from common.rate_limit import shared_rate_limiter
 from common.validators import AbsolutePath
 from utils import clean_stale_repositories
 
@@ -27,6 +28,16 @@ def _get_authenticated_url(repository_url: str) -> str:
     return repository_url
 
 
+async def _gitlab_api(func, *args, **kwargs):
+    """
+    Runs a blocking ogr call in a thread, once the GitLab rate limit allows.
+    ogr manages its own HTTP sessions, so this counts one request per call,
+    even though a call may make several.
+    """
+    await shared_rate_limiter().acquire("gitlab")
+    return await asyncio.to_thread(func, *args, **kwargs)
+
+
 async def fork_repository(
     repository: Annotated[str, Field(description="Repository URL")],
 ) -> str:
@@ -34,7 +45,7 @@ async def fork_repository(
     Creates a new fork of the specified repository if it doesn't exist yet,
     otherwise gets the existing fork. Returns a clonable git URL of the fork.
     """
-    project = await asyncio.to_thread(get_project, url=repository, token=os.getenv("GITLAB_TOKEN"))
+    project = await _gitlab_api(get_project, url=repository, token=os.getenv("GITLAB_TOKEN"))
     if not project:
         raise ToolError("Failed to get the specified repository")
 
@@ -52,7 +63,7 @@ async def fork_repository(
                 return fork
         return None
 
-    if fork := await asyncio.to_thread(get_fork):
+    if fork := await _gitlab_api(get_fork):
         return fork.get_git_urls()["git"]
 
     def create_fork():
@@ -64,7 +75,7 @@ async def fork_repository(
         fork = project.gitlab_repo.forks.create(data={"name": fork_name, "path": fork_name})
         return GitlabProject(namespace=fork.namespace["full_path"], service=project.service, repo=fork.path)
 
-    fork = await asyncio.to_thread(create_fork)
+    fork = await _gitlab_api(create_fork)
     if not fork:
         raise ToolError("Failed to fork the specified repository")
     return fork.get_git_urls()["git"]
@@ -81,16 +92,16 @@ async def open_merge_request(
     Opens a new merge request from the specified fork against its original repository.
     Returns URL of the opened merge request.
     """
-    project = await asyncio.to_thread(get_project, url=fork_url, token=os.getenv("GITLAB_TOKEN"))
+    project = await _gitlab_api(get_project, url=fork_url, token=os.getenv("GITLAB_TOKEN"))
     if not project:
         raise ToolError("Failed to get the specified fork")
     try:
-        pr = await asyncio.to_thread(project.create_pr, title, description, target, source)
+        pr = await _gitlab_api(project.create_pr, title, description, target, source)
     except GitlabAPIException as ex:
         logger.info("Gitlab API exception: %s", ex)
         if ex.response_code == 409:
             # 409 code means conflict: MR already exists; let's verify
-            prs = await asyncio.to_thread(project.parent.get_pr_list)
+            prs = await _gitlab_api(project.parent.get_pr_list)
             for pr in prs:
                 if pr.source_branch == source and pr.target_branch == target:
                     logger.info("Reusing existing MR %s", pr)
@@ -109,9 +120,9 @@ async def open_merge_request(
     for attempt in range(5):
         try:
             # First, verify the MR exists before trying to add the label
-            pr = await asyncio.to_thread(project.parent.get_pr, pr.id)
+            pr = await _gitlab_api(project.parent.get_pr, pr.id)
             # by default, set this label on a newly created MR so we can inspect it ASAP
-            await asyncio.to_thread(pr.add_label, "jotnar_needs_attention")
+            await _gitlab_api(pr.add_label, "jotnar_needs_attention")
             break
         except OgrException as ex:
             logger.info("Failed to add label on attempt %d/5, retrying. Error: %s", attempt + 1, ex)
@@ -132,11 +143,11 @@ async def get_internal_rhel_branches(
     repository_url = f"https://gitlab.com/redhat/rhel/rpms/{package}"
 
     try:
-        project = await asyncio.to_thread(get_project, url=repository_url, token=os.getenv("GITLAB_TOKEN"))
+        project = await _gitlab_api(get_project, url=repository_url, token=os.getenv("GITLAB_TOKEN"))
         if not project:
             raise ToolError(f"Failed to get repository for package: {package}")
 
-        branches = await asyncio.to_thread(project.get_branches)
+        branches = await _gitlab_api(project.get_branches)
         logger.info(f"Found {len(branches)} branches for package {package}: {branches}")
         return branches
 
@@ -223,14 +234,14 @@ async def add_merge_request_labels(
     project_path = match.group(1)
     mr_id = int(match.group(2))
 
-    project = await asyncio.to_thread(get_project, url=f"https://gitlab.com/{project_path}", token=os.getenv("GITLAB_TOKEN"))
+    project = await _gitlab_api(get_project, url=f"https://gitlab.com/{project_path}", token=os.getenv("GITLAB_TOKEN"))
     if not project:
         raise ToolError(f"Failed to get project: https://gitlab.com/{project_path}")
 
     try:
-        mr = await asyncio.to_thread(project.get_pr, mr_id)
+        mr = await _gitlab_api(project.get_pr, mr_id)
         for label in labels:
-            await asyncio.to_thread(mr.add_label, label)
+            await _gitlab_api(mr.add_label, label)
         return f"Successfully added labels {labels} to merge request {merge_request_url}"
     except Exception as e:
         raise ToolError(f"Failed to add labels to merge request: {e}")
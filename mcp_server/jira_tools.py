@@ -12,6 +12,7 @@ from fastmcp.exceptions import ToolError
 from pydantic import Field
 
 from common import CVEEligibilityResult
+from common.rate_limit import rate_limited_session
 
 # Jira custom field IDs
 SEVERITY_CUSTOM_FIELD = "customfield_12316142"
@@ -55,7 +56,7 @@ async def get_jira_details(
     """
     headers = _get_jira_headers(os.getenv("JIRA_TOKEN"))
 
-    async with aiohttp.ClientSession() as session:
+    async with rate_limited_session() as session:
         # Get main issue data
         try:
             async with session.get(
@@ -99,7 +100,7 @@ async def set_jira_fields(
     if os.getenv("DRY_RUN", "False").lower() == "true":
         return "Dry run, not updating Jira fields (this is expected, not an error)"
 
-    async with aiohttp.ClientSession() as session:
+    async with rate_limited_session() as session:
         # First, get the current issue to check existing field values
         try:
             async with session.get(
@@ -153,7 +154,7 @@ async def add_jira_comment(
     """
     Adds a comment to the specified Jira issue.
     """
-    async with aiohttp.ClientSession() as session:
+    async with rate_limited_session() as session:
         try:
             async with session.post(
                 urljoin(os.getenv("JIRA_URL"), f"rest/api/2/issue/{issue_key}/comment"),
@@ -180,7 +181,7 @@ async def check_cve_triage_eligibility(
     """
     headers = _get_jira_headers(os.getenv("JIRA_TOKEN"))
 
-    async with aiohttp.ClientSession() as session:
+    async with rate_limited_session() as session:
         try:
             async with session.get(
                 urljoin(os.getenv("JIRA_URL"), f"rest/api/2/issue/{issue_key}"),
@@ -264,7 +265,7 @@ async def change_jira_status(
     headers = _get_jira_headers(os.getenv("JIRA_TOKEN"))
     jira_url = urljoin(os.getenv("JIRA_URL"), f"rest/api/2/issue/{issue_key}/transitions")
 
-    async with aiohttp.ClientSession() as session:
+    async with rate_limited_session() as session:
         try:
             async with session.get(
                 urljoin(os.getenv("JIRA_URL"), f"rest/api/2/issue/{issue_key}"),
@@ -334,7 +335,7 @@ async def edit_jira_labels(
 
     payload = {"update": {"labels": update_payload}}
 
-    async with aiohttp.ClientSession() as session:
+    async with rate_limited_session() as session:
         try:
             async with session.put(
                 jira_url,
@@ -357,7 +358,7 @@ async def verify_issue_author(
     """
     headers = _get_jira_headers(os.getenv("JIRA_TOKEN"))
 
-    async with aiohttp.ClientSession() as session:
+    async with rate_limited_session() as session:
         try:
             async with session.get(
                 urljoin(os.getenv("JIRA_URL"), f"rest/api/2/issue/{issue_key}"),
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmarks parsing of the Errata Tool workflow rules page, comparing parsing
+the whole page with BeautifulSoup against parse_erratum_transition_rules(),
+which only parses the table we need, and checks that both agree.
+
+The pages in scripts/fixtures/ are small made-up samples with the structure
+of the real page (rules table first, followed by the advisory history); they
+are only good for checking that the parsers agree. For meaningful timings,
+save some real pages, e.g.:
+
+    curl --negotiate -u : -o rules.html \\
+        https://errata.engineering.redhat.com/workflow_rules/for_advisory/<id>
+
+and pass them on the command line. Run from the top-level directory, in an
+environment with the supervisor's dependencies (e.g. the supervisor container):
+
+    python scripts/benchmark-workflow-rules.py [PAGE.html...]
+"""
+
+import argparse
+from pathlib import Path
+import sys
+import timeit
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from supervisor.errata_utils import (  # noqa: E402
+    parse_erratum_transition_rules,
+    parse_transition_rules_tbody,
+)
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+def parse_full_page(html: str):
+    soup = BeautifulSoup(html, "lxml")
+    assert soup.tbody is not None
+    return parse_transition_rules_tbody(soup.tbody)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", "--number", type=int, default=50)
+    parser.add_argument(
+        "pages",
+        nargs="*",
+        type=Path,
+        help="Saved workflow rules pages (default: the samples in scripts/fixtures/)",
+    )
+    args = parser.parse_args()
+
+    pages = args.pages or sorted(FIXTURES_DIR.glob("workflow_rules_*.html"))
+    for page in pages:
+        html = page.read_text()
+
+        # Both parsers must agree
+        assert parse_full_page(html) == parse_erratum_transition_rules(html)
+
+        print(f"{page.name} ({len(html) // 1024} KiB):")
+        for name, func in [
+            ("full page", parse_full_page),
+            ("rules table only", parse_erratum_transition_rules),
+        ]:
+            seconds = timeit.timeit(lambda: func(html), number=args.number)
+            print(f"  {name:20} {1000 * seconds / args.number:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import asyncio
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from functools import wraps
+import inspect
+import threading
+from typing import Any, Callable, Hashable, TypeVar
+
+
+# Within one collection or processing cycle, the same issue, erratum, etc.
+# is often looked up several times - for example, by a handler and then
+# again by a tool of the agent it runs. The cycle cache makes those lookups
+# share one fetch (including concurrent ones, from other tasks or threads).
+# Since it only lives for the cycle, we don't need to worry about staleness.
+
+
+class _CycleCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries: dict[Hashable, "asyncio.Task[Any] | Future[Any]"] = {}
+
+
+_cycle_cache = ContextVar[_CycleCache | None]("cycle_cache", default=None)
+
+
+@asynccontextmanager
+async def with_cycle_cache():
+    """
+    Context manager that sets up a cache for functions decorated with
+    @cycle_cached, for the duration of the enclosed code.
+
+    This can also be used as a decorator on async functions.
+    """
+    if _cycle_cache.get() is not None:
+        yield
+        return
+
+    token = _cycle_cache.set(_CycleCache())
+    try:
+        yield
+    finally:
+        _cycle_cache.reset(token)
+
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def cycle_cached(func: F) -> F:
+    """
+    Decorator for a function (sync or async) whose result should be shared
+    between calls with the same arguments within with_cycle_cache(). Outside
+    of with_cycle_cache(), the function is simply called. Failures are not
+    cached.
+    """
+
+    def cache_key(args, kwargs) -> Hashable:
+        return (func.__module__, func.__qualname__, args, frozenset(kwargs.items()))
+
+    if inspect.iscoroutinefunction(func):
+
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            cache = _cycle_cache.get()
+            if cache is None:
+                return await func(*args, **kwargs)
+
+            key = cache_key(args, kwargs)
+            with cache.lock:
+                task = cache.entries.get(key)
+                if task is None:
+                    task = asyncio.create_task(func(*args, **kwargs))
+                    cache.entries[key] = task
+
+                    def forget_failure(task):
+                        if task.cancelled() or task.exception() is not None:
+                            with cache.lock:
+                                if cache.entries.get(key) is task:
+                                    del cache.entries[key]
+
+                    task.add_done_callback(forget_failure)
+
+            # Shielded, so that one caller being cancelled doesn't affect the others
+            return await asyncio.shield(task)
+
+        return async_wrapper  # type: ignore
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        cache = _cycle_cache.get()
+        if cache is None:
+            return func(*args, **kwargs)
+
+        key = cache_key(args, kwargs)
+        with cache.lock:
+            future = cache.entries.get(key)
+            owner = future is None
+            if future is None:
+                future = cache.entries[key] = Future()
+
+        if not owner:
+            return future.result()
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            with cache.lock:
+                del cache.entries[key]
+            future.set_exception(e)
+            raise
+
+        future.set_result(result)
+        return result
+
+    return wrapper  # type: ignore
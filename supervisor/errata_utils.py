@@ -1,16 +1,19 @@
+import asyncio
 from datetime import datetime, timezone
 from enum import StrEnum
 from datetime import datetime
 from functools import cache
 import logging
 import os
-from typing import overload
+import time
+from typing import Collection, overload
 from typing_extensions import Literal
 
 from bs4 import BeautifulSoup, Tag  # type: ignore
 from pydantic import BaseModel
 from requests_gssapi import HTTPSPNEGOAuth
 
+from .cycle_cache import cycle_cached
 from .http_utils import requests_session
 from .supervisor_types import Erratum, FullErratum, ErrataStatus, Comment
 
@@ -68,6 +71,7 @@ def get_erratum(erratum_id: str | int, full: Literal[False] = False) -> Erratum:
 def get_erratum(erratum_id: str | int, full: Literal[True]) -> FullErratum: ...
 
 
+@cycle_cached
 def get_erratum(erratum_id: str | int, full: bool = False) -> Erratum | FullErratum:
     logger.debug("Getting detailed information for erratum %s", erratum_id)
     data = ET_api_get(f"erratum/{erratum_id}")
@@ -114,6 +118,7 @@ def get_erratum(erratum_id: str | int, full: bool = False) -> Erratum | FullErra
         return base_erratum
 
 
+@cycle_cached
 def get_erratum_comments(erratum_id: str | int) -> list[Comment] | None:
     """Get all comments for an erratum with the given erratum_id"""
     logger.debug("Getting comments for erratum %s", erratum_id)
@@ -140,11 +145,29 @@ def get_erratum_for_link(link: str, full: Literal[False] = False) -> Erratum: ..
 def get_erratum_for_link(link: str, full: Literal[True]) -> FullErratum: ...
 
 
-def get_erratum_for_link(link: str, full: bool = True) -> Erratum | FullErratum:
+def get_erratum_for_link(link: str, full: bool = False) -> Erratum | FullErratum:
     erratum_id = link.split("/")[-1]
     return get_erratum(erratum_id, full=full)
 
 
+MAX_CONCURRENT_ERRATA_REQUESTS = 8
+
+
+async def get_errata_for_links(links: Collection[str]) -> list[Erratum]:
+    """
+    Get the errata for a number of links. requests_gssapi is synchronous, so
+    the requests are made from worker threads, a limited number at a time.
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_ERRATA_REQUESTS)
+
+    async def fetch(link: str) -> Erratum:
+        async with semaphore:
+            # to_thread() copies the context, so the thread uses our requests session
+            return await asyncio.to_thread(get_erratum_for_link, link)
+
+    return await asyncio.gather(*(fetch(link) for link in links))
+
+
 class RuleParseError(Exception):
     pass
 
@@ -171,28 +194,104 @@ class TransitionRuleSet(BaseModel):
         return all(rule.outcome == TransitionRuleOutcome.OK for rule in self.rules)
 
 
-def get_erratum_transition_rules(erratum_id) -> TransitionRuleSet:
+# Fetching and parsing the workflow rules page is slow, so we cache the result.
+# The rules mostly change when the erratum changes state or is pushed, so those
+# are part of the cache key; since other things (test results, security alerts,
+# ...) can also affect the rules, entries also expire after a while, and we
+# drop the entries for an erratum when we act on it. Rule sets that are blocked
+# by anything but the stage push (whose state is part of the key) are not
+# cached at all, since they are usually fixed by a person, and we need to
+# notice that right away.
+TRANSITION_RULES_CACHE_TTL = 60 * 60  # seconds
+
+_transition_rules_cache: dict[int, tuple[tuple, float, TransitionRuleSet]] = {}
+
+
+def invalidate_erratum_transition_rules(erratum_id) -> None:
+    _transition_rules_cache.pop(int(erratum_id), None)
+
+
+def _is_cacheable(rule_set: TransitionRuleSet) -> bool:
+    return all(
+        rule.outcome == TransitionRuleOutcome.OK or rule.name == "Stagepush"
+        for rule in rule_set.rules
+    )
+
+
+def get_erratum_transition_rules(
+    erratum_id, last_status_transition_timestamp: datetime | None = None
+) -> TransitionRuleSet:
     """
     Gets the status of the "state transition guards" that determine whether an
     erratum can be moved to the next state. (We use the terminology "rule" here
     rather than "guard" for simplicity, since the guard terminology is internal
     to the Errata Tool codebase)
 
-    There is no API for this in the Errata Tool API, so we have to scrape the HTML.
+    If last_status_transition_timestamp is passed, a cached result may be
+    returned. Checking whether it is still valid needs the latest stage push,
+    which is much cheaper to fetch than the rules.
     """
+    if last_status_transition_timestamp is None:
+        return _fetch_erratum_transition_rules(erratum_id)
 
+    cache_key = (
+        last_status_transition_timestamp,
+        erratum_get_latest_stage_push(erratum_id),
+    )
+    now = time.monotonic()
+    cached = _transition_rules_cache.get(int(erratum_id))
+    if (
+        cached is not None
+        and cached[0] == cache_key
+        and now - cached[1] < TRANSITION_RULES_CACHE_TTL
+    ):
+        logger.debug("Using cached transition rules for erratum %s", erratum_id)
+        return cached[2]
+
+    rule_set = _fetch_erratum_transition_rules(erratum_id)
+    if _is_cacheable(rule_set):
+        _transition_rules_cache[int(erratum_id)] = (cache_key, now, rule_set)
+    else:
+        invalidate_erratum_transition_rules(erratum_id)
+
+    return rule_set
+
+
+def _fetch_erratum_transition_rules(erratum_id) -> TransitionRuleSet:
     # If show_all=1 is added to the URL, the table will include rules
     # for all defined state transitions, without it just gives the
     # rules for the current state to the "next" one.
     html = ET_get_html(
         f"/workflow_rules/for_advisory/{erratum_id}",
     )
-    soup = BeautifulSoup(html, "lxml")
+    return parse_erratum_transition_rules(html)
+
+
+def parse_erratum_transition_rules(html: str) -> TransitionRuleSet:
+    """
+    Parses the workflow rules page of the Errata Tool - there is no API for
+    this in the Errata Tool API, so we have to scrape the HTML.
+
+    The page is large, but we only need the first table body, so rather than
+    parsing the whole page, we cut that out and parse just it.
+    """
+    start = html.find("<tbody")
+    end = html.find("</tbody>", start)
+    if start < 0 or end < 0:
+        raise RuleParseError("No tbody found")
+
+    soup = BeautifulSoup(
+        "<table>" + html[start : end + len("</tbody>")] + "</table>", "lxml"
+    )
 
     tbody = soup.tbody
     if tbody is None:
         raise RuleParseError("No tbody found")
 
+    return parse_transition_rules_tbody(tbody)
+
+
+def parse_transition_rules_tbody(tbody: Tag) -> TransitionRuleSet:
     rows = tbody.find_all("tr")
     transition_row = rows[0]
     # These assertions are because BeautifulSoup's typing doesn't represent
@@ -267,7 +366,12 @@ class ErratumPushStatus(StrEnum):
     FAILED = "FAILED"
 
 
-def erratum_get_latest_stage_push_status(erratum_id) -> ErratumPushStatus | None:
+# Shared by get_erratum_transition_rules() and erratum_get_latest_stage_push_status()
+@cycle_cached
+def erratum_get_latest_stage_push(
+    erratum_id,
+) -> tuple[int, ErratumPushStatus] | None:
+    """Returns the ID and status of the latest stage push of the erratum, if any"""
     pushes = ET_api_get(
         f"erratum/{erratum_id}/push",
     )
@@ -279,7 +383,12 @@ def erratum_get_latest_stage_push_status(erratum_id) -> ErratumPushStatus | None
             highest_push_id = push["id"]
             status = push["status"]
 
-    return ErratumPushStatus(status) if status else None
+    return (highest_push_id, ErratumPushStatus(status)) if status else None
+
+
+def erratum_get_latest_stage_push_status(erratum_id) -> ErratumPushStatus | None:
+    latest_push = erratum_get_latest_stage_push(erratum_id)
+    return latest_push[1] if latest_push else None
 
 
 def erratum_push_to_stage(erratum_id, *, dry_run: bool = False):
@@ -287,6 +396,7 @@ def erratum_push_to_stage(erratum_id, *, dry_run: bool = False):
         logger.info("Dry run: Would stage push erratum %s to stage", erratum_id)
         return
 
+    invalidate_erratum_transition_rules(erratum_id)
     ET_api_post(
         f"erratum/{erratum_id}/push",
         data={"defaults": "stage"},
@@ -298,6 +408,7 @@ def erratum_refresh_security_alerts(erratum_id, *, dry_run: bool = False):
         logger.info("Dry run: Would refresh security alerts for erratum %s", erratum_id)
         return
 
+    invalidate_erratum_transition_rules(erratum_id)
     ET_api_post(f"erratum/{erratum_id}/security_alerts/refresh", {})
 
 
@@ -1,6 +1,9 @@
+import asyncio
 import logging
 from textwrap import dedent
 
+from common.async_cache import cache_async
+
 from .work_item_handler import WorkItemHandler
 from .errata_utils import (
     ErratumPushStatus,
@@ -10,13 +13,21 @@ from .errata_utils import (
     erratum_push_to_stage,
     erratum_refresh_security_alerts,
     get_erratum_transition_rules,
+    invalidate_erratum_transition_rules,
 )
 from .jira_utils import (
     add_issue_label,
     create_issue,
     get_issue_by_jotnar_tag,
+    get_issues_by_jotnar_tag,
+)
+from .supervisor_types import (
+    ErrataStatus,
+    Erratum,
+    Issue,
+    JotnarTag,
+    WorkflowResult,
 )
-from .supervisor_types import ErrataStatus, Erratum, JotnarTag, WorkflowResult
 
 
 logger = logging.getLogger(__name__)
@@ -33,13 +44,23 @@ def _needs_attention_tag(erratum_id: int) -> JotnarTag:
     return JotnarTag(type="needs_attention", resource="erratum", id=str(erratum_id))
 
 
-def erratum_needs_attention(erratum_id: int) -> bool:
-    issue = get_issue_by_jotnar_tag(
-        "RHELMISC",
-        _needs_attention_tag(erratum_id),
-        with_label="jotnar_needs_attention",
+# Rather than searching for the tag of each erratum we look at, we fetch all
+# the open issues flagged for attention at once, and reuse the result for a
+# short time - long enough to cover a collection cycle, or a burst of errata
+# being processed.
+NEEDS_ATTENTION_MAX_AGE = 60  # seconds
+
+
+@cache_async(max_age=NEEDS_ATTENTION_MAX_AGE)
+async def _get_needs_attention_issues() -> dict[str, Issue]:
+    return await get_issues_by_jotnar_tag(
+        "RHELMISC", with_label="jotnar_needs_attention"
     )
-    return issue is not None
+
+
+async def erratum_needs_attention(erratum_id: int) -> bool:
+    issues = await _get_needs_attention_issues()
+    return str(_needs_attention_tag(erratum_id)) in issues
 
 
 class ErratumHandler(WorkItemHandler):
@@ -53,19 +74,22 @@ class ErratumHandler(WorkItemHandler):
         super().__init__(dry_run=dry_run)
         self.erratum = erratum
 
-    def resolve_flag_attention(self, why: str):
+    async def resolve_flag_attention(self, why: str):
+        # Whatever needs attention will be fixed by a person, so once they
+        # are done, we must look at the rules again
+        invalidate_erratum_transition_rules(self.erratum.id)
         tag = _needs_attention_tag(self.erratum.id)
 
-        issue = get_issue_by_jotnar_tag("RHELMISC", tag)
+        issue = await get_issue_by_jotnar_tag("RHELMISC", tag)
         if issue is not None:
-            add_issue_label(
+            await add_issue_label(
                 issue.key,
                 "jotnar_needs_attention",
                 why,
                 dry_run=self.dry_run,
             )
         else:
-            create_issue(
+            await create_issue(
                 project="RHELMISC",
                 summary=f"Erratum {self.erratum.id} needs attention",
                 description=why,
@@ -79,8 +103,10 @@ class ErratumHandler(WorkItemHandler):
 
         return WorkflowResult(status=why, reschedule_in=-1)
 
-    def resolve_set_status(self, status: ErrataStatus, why: str):
-        erratum_change_state(self.erratum.id, status, dry_run=self.dry_run)
+    async def resolve_set_status(self, status: ErrataStatus, why: str):
+        await asyncio.to_thread(
+            erratum_change_state, self.erratum.id, status, dry_run=self.dry_run
+        )
 
         if status in (ErrataStatus.NEW_FILES, ErrataStatus.QE):
             reschedule_delay = 0
@@ -89,15 +115,21 @@ class ErratumHandler(WorkItemHandler):
 
         return WorkflowResult(status=why, reschedule_in=reschedule_delay)
 
-    def try_to_advance_erratum(self, new_status: ErrataStatus) -> WorkflowResult:
-        rule_set = get_erratum_transition_rules(self.erratum.id)
+    async def try_to_advance_erratum(self, new_status: ErrataStatus) -> WorkflowResult:
+        # The Errata Tool calls are synchronous (and may wait for the rate
+        # limiter), so we make them from a thread to keep the event loop going
+        rule_set = await asyncio.to_thread(
+            get_erratum_transition_rules,
+            self.erratum.id,
+            self.erratum.last_status_transition_timestamp,
+        )
         if rule_set.to_status != new_status:
-            return self.resolve_flag_attention(
+            return await self.resolve_flag_attention(
                 f"Next state is {rule_set.to_status} instead of {new_status}"
             )
 
         if rule_set.all_ok:
-            return self.resolve_set_status(
+            return await self.resolve_set_status(
                 new_status, f"Moving to {new_status}, since all rules are OK"
             )
         else:
@@ -105,18 +137,24 @@ class ErratumHandler(WorkItemHandler):
                 if rule.outcome != TransitionRuleOutcome.OK:
                     if rule.name == "Stagepush":
                         # is it already running?
-                        existing = erratum_get_latest_stage_push_status(self.erratum.id)
+                        existing = await asyncio.to_thread(
+                            erratum_get_latest_stage_push_status, self.erratum.id
+                        )
                         # COMPLETE == not valid after respin ...
                         if existing in (
                             None,
                             ErratumPushStatus.COMPLETE,
                         ):
-                            erratum_push_to_stage(self.erratum.id, dry_run=self.dry_run)
+                            await asyncio.to_thread(
+                                erratum_push_to_stage,
+                                self.erratum.id,
+                                dry_run=self.dry_run,
+                            )
                             return self.resolve_wait(
                                 f"Stage-pushing erratum {self.erratum.id} before moving to {new_status}"
                             )
                         elif existing == ErratumPushStatus.FAILED:
-                            return self.resolve_flag_attention(
+                            return await self.resolve_flag_attention(
                                 f"Stage-push previously FAILED for erratum {self.erratum.id},"
                                 f" needs manual intervention before moving to {new_status}"
                             )
@@ -126,14 +164,16 @@ class ErratumHandler(WorkItemHandler):
                                 f" waiting for completion before moving to {new_status}"
                             )
                     elif rule.name == "Securityalert":
-                        erratum_refresh_security_alerts(
-                            self.erratum.id, dry_run=self.dry_run
+                        await asyncio.to_thread(
+                            erratum_refresh_security_alerts,
+                            self.erratum.id,
+                            dry_run=self.dry_run,
                         )
                         return self.resolve_wait(
                             f"Refreshing security alerts for erratum {self.erratum.id} before moving to {new_status}"
                         )
 
-            return self.resolve_flag_attention(
+            return await self.resolve_flag_attention(
                 dedent(
                     f"""\
                     Transition to {new_status} is blocked by:\n
@@ -151,18 +191,18 @@ class ErratumHandler(WorkItemHandler):
             erratum.full_advisory,
         )
 
-        if erratum_needs_attention(erratum.id):
+        if await erratum_needs_attention(erratum.id):
             return self.resolve_remove_work_item(
                 "Erratum already flagged for human attention"
             )
 
         if erratum.status == ErrataStatus.NEW_FILES:
-            return self.try_to_advance_erratum(ErrataStatus.QE)
+            return await self.try_to_advance_erratum(ErrataStatus.QE)
         elif erratum.status == ErrataStatus.QE:
             if not erratum.all_issues_release_pending:
                 return self.resolve_remove_work_item(
                     "Not all issues are release pending"
                 )
-            return self.try_to_advance_erratum(ErrataStatus.REL_PREP)
+            return await self.try_to_advance_erratum(ErrataStatus.REL_PREP)
         else:
             return self.resolve_remove_work_item(f"status is {erratum.status}")
@@ -4,6 +4,7 @@ import aiohttp
 
 import requests
 
+from common.rate_limit import rate_limited_session, shared_sync_rate_limiter
 
 # We use *both* aiohttp and requests in various places, so we need to
 # set up sessions for both libraries. (We can't convert everything to
@@ -20,16 +21,16 @@ _aiohttp_session = ContextVar[aiohttp.ClientSession | None](
 async def with_aiohttp_session():
     """
     Context manager that sets up a scoped aiohttp.ClientSession
-    appropriate for our usage; currently it's just a plain session,
-    but it could be extended in the future to, e.g, have retries
-    or timeouts.
+    appropriate for our usage; requests made with it are rate limited
+    (see common.rate_limit), but it could be extended in the future
+    to, e.g, have retries or timeouts.
 
     This can also be used as a decorator on async functions.
     """
     session = _aiohttp_session.get()
 
     if session is None:
-        async with aiohttp.ClientSession() as session:
+        async with rate_limited_session() as session:
             token = _aiohttp_session.set(session)
             try:
                 yield session
@@ -60,9 +61,9 @@ _requests_session = ContextVar[requests.Session | None](
 async def with_requests_session():
     """
     Context manager that sets up a scoped requests.Session
-    appropriate for our usage; currently it's just a plain session,
-    but it could be extended in the future to, e.g, have retries
-    or timeouts.
+    appropriate for our usage; requests made with it are rate limited
+    (see common.rate_limit), but it could be extended in the future
+    to, e.g, have retries or timeouts.
 
     This can also be used as a decorator on async functions.
     """
@@ -70,6 +71,7 @@ async def with_requests_session():
 
     if session is None:
         with requests.Session() as session:
+            session.mount("https://", shared_sync_rate_limiter().adapter())
             token = _requests_session.set(session)
             try:
                 yield session
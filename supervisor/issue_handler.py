@@ -1,3 +1,4 @@
+import asyncio
 import logging
 
 from .errata_utils import get_erratum_for_link
@@ -26,8 +27,14 @@ class IssueHandler(WorkItemHandler):
         super().__init__(dry_run=dry_run)
         self.issue = issue
 
-    def resolve_set_status(self, status: IssueStatus, why: str):
-        change_issue_status(self.issue.key, status, why, dry_run=self.dry_run)
+    async def resolve_set_status(self, status: IssueStatus, why: str):
+        await change_issue_status(
+            self.issue.key,
+            status,
+            why,
+            current_status=self.issue.status,
+            dry_run=self.dry_run,
+        )
 
         if status in (IssueStatus.RELEASE_PENDING, IssueStatus.CLOSED):
             reschedule_delay = -1
@@ -36,8 +43,8 @@ class IssueHandler(WorkItemHandler):
 
         return WorkflowResult(status=why, reschedule_in=reschedule_delay)
 
-    def resolve_flag_attention(self, why: str):
-        add_issue_label(
+    async def resolve_flag_attention(self, why: str):
+        await add_issue_label(
             self.issue.key,
             "jotnar_needs_attention",
             why,
@@ -67,17 +74,21 @@ class IssueHandler(WorkItemHandler):
             IssueStatus.PLANNING,
             IssueStatus.IN_PROGRESS,
         ):
-            return self.resolve_set_status(
+            return await self.resolve_set_status(
                 IssueStatus.INTEGRATION,
                 "Preliminary testing has passed, moving to Integration",
             )
         elif issue.status == IssueStatus.INTEGRATION:
             related_erratum = (
-                get_erratum_for_link(issue.errata_link, full=True) if issue.errata_link else None
+                await asyncio.to_thread(
+                    get_erratum_for_link, issue.errata_link, full=True
+                )
+                if issue.errata_link
+                else None
             )
             testing_analysis = await analyze_issue(issue, related_erratum)
             if testing_analysis.state == TestingState.NOT_RUNNING:
-                return self.resolve_flag_attention(
+                return await self.resolve_flag_attention(
                     testing_analysis.comment
                     or "Tests aren't running, and can't figure out how to run them. "
                     "(The testing analysis agent returned an empty comment)",
@@ -87,13 +98,13 @@ class IssueHandler(WorkItemHandler):
             elif testing_analysis.state == TestingState.RUNNING:
                 return self.resolve_wait("Tests are running")
             elif testing_analysis.state == TestingState.FAILED:
-                return self.resolve_flag_attention(
+                return await self.resolve_flag_attention(
                     testing_analysis.comment
                     or "Tests failed. "
                     "(The testing analysis agent returned an empty comment)",
                 )
             elif testing_analysis.state == TestingState.PASSED:
-                return self.resolve_set_status(
+                return await self.resolve_set_status(
                     IssueStatus.RELEASE_PENDING,
                     testing_analysis.comment
                     or "Final testing has passed, moving to Release Pending. "
@@ -1,12 +1,19 @@
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from datetime import datetime
 from enum import Enum, StrEnum
 from functools import cache
+import json
 import logging
 import os
+import time
 from typing import (
     Any,
+    AsyncGenerator,
+    Awaitable,
+    Callable,
     Collection,
-    Generator,
     Literal,
     Type,
     TypeVar,
@@ -14,7 +21,14 @@ from typing import (
 )
 from urllib.parse import quote as urlquote
 
-from .http_utils import requests_session
+import aiohttp
+from pydantic import ValidationError
+
+from common.async_cache import cache_async
+
+from .cycle_cache import cycle_cached
+from .http_utils import with_http_sessions, aiohttp_session
+from .redis_utils import current_redis_client
 from .supervisor_types import (
     FullIssue,
     Issue,
@@ -63,62 +77,132 @@ def jira_headers() -> dict[str, str]:
     }
 
 
-def jira_api_get(path: str, *, params: dict | None = None) -> Any:
+# These use the shared aiohttp session, so that connections to the JIRA
+# server are kept alive and reused between requests.
+
+
+async def jira_api_get(path: str, *, params: dict | None = None) -> Any:
     url = f"{jira_url()}/rest/api/2/{path}"
-    response = requests_session().get(url, headers=jira_headers(), params=params)
-    response.raise_for_status()
-    return response.json()
+    async with aiohttp_session().get(
+        url, headers=jira_headers(), params=params
+    ) as response:
+        response.raise_for_status()
+        return await response.json()
 
 
 @overload
-def jira_api_post(
+async def jira_api_post(
     path: str, json: dict[str, Any], *, decode_response: Literal[False] = False
 ) -> None: ...
 
 
 @overload
-def jira_api_post(
+async def jira_api_post(
     path: str, json: dict[str, Any], *, decode_response: Literal[True]
 ) -> Any: ...
 
 
-def jira_api_post(
+async def jira_api_post(
     path: str, json: dict[str, Any], *, decode_response: bool = False
 ) -> Any | None:
     url = f"{jira_url()}/rest/api/2/{path}"
-    response = requests_session().post(url, headers=jira_headers(), json=json)
-    response.raise_for_status()
-    if decode_response:
-        return response.json()
+    async with aiohttp_session().post(
+        url, headers=jira_headers(), json=json
+    ) as response:
+        response.raise_for_status()
+        if decode_response:
+            return await response.json()
 
 
 @overload
-def jira_api_put(
+async def jira_api_put(
     path: str, json: dict[str, Any], *, decode_response: Literal[False] = False
 ) -> None: ...
 
 
 @overload
-def jira_api_put(
+async def jira_api_put(
     path: str, json: dict[str, Any], *, decode_response: Literal[True]
 ) -> Any: ...
 
 
-def jira_api_put(
+async def jira_api_put(
     path: str, json: dict[str, Any], *, decode_response: bool = False
 ) -> Any | None:
     url = f"{jira_url()}/rest/api/2/{path}"
-    response = requests_session().put(url, headers=jira_headers(), json=json)
-    response.raise_for_status()
-    if decode_response:
-        return response.json()
+    async with aiohttp_session().put(
+        url, headers=jira_headers(), json=json
+    ) as response:
+        response.raise_for_status()
+        if decode_response:
+            return await response.json()
+
+
+# Jira metadata that rarely changes (custom field IDs, user keys) is persisted
+# in Redis, when available, so that new processes don't have to look it up
+# again. Entries older than JIRA_METADATA_REFRESH_AGE are still used, but are
+# refreshed in the background.
+JIRA_METADATA_KEY_PREFIX = "supervisor_jira_metadata:"
+JIRA_METADATA_REFRESH_AGE = 24 * 60 * 60  # seconds
+JIRA_METADATA_TTL = 30 * 24 * 60 * 60  # seconds
+
+_metadata_refreshes: dict[str, asyncio.Task[Any]] = {}
+
+
+async def _get_jira_metadata(name: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+    client = current_redis_client()
+    if client is None:
+        return await fetch()
+
+    key = JIRA_METADATA_KEY_PREFIX + name
+
+    async def refresh() -> Any:
+        value = await fetch()
+        await client.set(
+            key,
+            json.dumps({"value": value, "fetched": time.time()}),
+            ex=JIRA_METADATA_TTL,
+        )
+        return value
+
+    cached_data = await client.get(key)
+    if cached_data is None:
+        return await refresh()
+
+    cached = json.loads(cached_data)
+    if (
+        time.time() - cached["fetched"] > JIRA_METADATA_REFRESH_AGE
+        and name not in _metadata_refreshes
+    ):
+        logger.debug("Refreshing Jira metadata %s in the background", name)
+        task = asyncio.create_task(refresh())
+        _metadata_refreshes[name] = task
+
+        def done(task: asyncio.Task[Any]) -> None:
+            del _metadata_refreshes[name]
+            if not task.cancelled() and task.exception() is not None:
+                logger.warning(
+                    "Failed to refresh Jira metadata %s",
+                    name,
+                    exc_info=task.exception(),
+                )
 
+        task.add_done_callback(done)
 
-@cache
-def get_custom_fields() -> dict[str, str]:
-    response = jira_api_get("field")
-    return {field["name"]: field["id"] for field in response}
+    return cached["value"]
+
+
+@cache_async(max_age=JIRA_METADATA_REFRESH_AGE)
+async def get_custom_fields() -> dict[str, str]:
+    async def fetch() -> dict[str, str]:
+        response = await jira_api_get("field")
+        return {field["name"]: field["id"] for field in response}
 
+    return await _get_jira_metadata("custom_fields", fetch)
+
+
+SEARCH_PAGE_SIZE = 1000
+MAX_CONCURRENT_SEARCH_PAGES = 4
 
 CURRENT_ISSUES_JQL = """
 project = RHEL AND AssignedTeam = rhel-jotnar
@@ -128,15 +212,15 @@ AND 'Fixed in Build' is not EMPTY
 
 
 @overload
-def decode_issue(issue_data: Any, full: Literal[False] = False) -> Issue: ...
+async def decode_issue(issue_data: Any, full: Literal[False] = False) -> Issue: ...
 
 
 @overload
-def decode_issue(issue_data: Any, full: Literal[True]) -> FullIssue: ...
+async def decode_issue(issue_data: Any, full: Literal[True]) -> FullIssue: ...
 
 
-def decode_issue(issue_data: Any, full: bool = False) -> Issue | FullIssue:
-    custom_fields = get_custom_fields()
+async def decode_issue(issue_data: Any, full: bool = False) -> Issue | FullIssue:
+    custom_fields = await get_custom_fields()
 
     _E = TypeVar("_E", bound=Enum)
 
@@ -174,6 +258,7 @@ def decode_issue(issue_data: Any, full: bool = False) -> Issue | FullIssue:
         fixed_in_build=custom("Fixed in Build"),
         test_coverage=custom_enum_list(TestCoverage, "Test Coverage"),
         preliminary_testing=custom_enum(PreliminaryTesting, "Preliminary Testing"),
+        updated=datetime.fromisoformat(issue_data["fields"]["updated"]),
     )
 
     if full:
@@ -194,17 +279,18 @@ def decode_issue(issue_data: Any, full: bool = False) -> Issue | FullIssue:
         return issue
 
 
-def _fields(full: bool):
+async def _fields(full: bool):
     # Passing in the specific list of fields improves performance
     # significantly - in a test case, it reduced the time to fetch
     # 145 issues from 16s to 0.7s.
 
-    custom_fields = get_custom_fields()
+    custom_fields = await get_custom_fields()
     base_fields = [
         "components",
         "summary",
         "status",
         "fixVersions",
+        "updated",
         custom_fields["Errata Link"],
         custom_fields["Fixed in Build"],
         custom_fields["Test Coverage"],
@@ -217,59 +303,208 @@ def _fields(full: bool):
 
 
 @overload
-def get_issue(issue_key: str, full: Literal[False] = False) -> Issue: ...
+async def get_issue(issue_key: str, full: Literal[False] = False) -> Issue: ...
 
 
 @overload
-def get_issue(issue_key: str, full: Literal[True]) -> FullIssue: ...
+async def get_issue(issue_key: str, full: Literal[True]) -> FullIssue: ...
+
 
+@cycle_cached
+async def get_issue(issue_key: str, full: bool = False) -> Issue | FullIssue:
+    if full:
+        cached_issue = await _get_cached_full_issue(issue_key)
+        if cached_issue is not None:
+            return cached_issue
 
-def get_issue(issue_key: str, full: bool = False) -> Issue | FullIssue:
-    path = f"issue/{urlquote(issue_key)}?fields={','.join(_fields(full))}"
+    path = f"issue/{urlquote(issue_key)}?fields={','.join(await _fields(full))}"
     # Passing fields using the params dict caused the response time to increase;
     # perhaps the JIRA server isn't properly decoding encoded `,` characters and ignoring
     # fields, so we build the URL ourselves
-    response_data = jira_api_get(path)
-    return decode_issue(response_data, full)
+    response_data = await jira_api_get(path)
+    issue = await decode_issue(response_data, full)
+
+    if full:
+        await _cache_full_issue(issue)
+
+    return issue
+
+
+# Full issues (with description and comments) are cached in Redis, when
+# available, and revalidated against the issue's "updated" timestamp,
+# which is much cheaper to fetch.
+ISSUE_CACHE_KEY_PREFIX = "supervisor_issue_cache:"
+ISSUE_CACHE_TTL = 7 * 24 * 60 * 60  # seconds
+
+
+async def _get_cached_full_issue(issue_key: str) -> FullIssue | None:
+    client = current_redis_client()
+    if client is None:
+        return None
+
+    cache_key = ISSUE_CACHE_KEY_PREFIX + issue_key
+    cached_data = await client.get(cache_key)
+    if cached_data is None:
+        return None
+
+    try:
+        issue = FullIssue.model_validate_json(cached_data)
+    except ValidationError:
+        # Written by a version with a different FullIssue model
+        logger.debug("Discarding invalid cached copy of %s", issue_key, exc_info=True)
+        await client.delete(cache_key)
+        return None
+
+    response_data = await jira_api_get(f"issue/{urlquote(issue_key)}?fields=updated")
+    updated = datetime.fromisoformat(response_data["fields"]["updated"])
+    if issue.updated != updated:
+        logger.debug("Cached copy of %s is out of date", issue_key)
+        return None
+
+    logger.debug("Using cached copy of %s", issue_key)
+    return issue
+
+
+async def _cache_full_issue(issue: FullIssue) -> None:
+    client = current_redis_client()
+    if client is None or issue.updated is None:
+        return
+
+    await client.set(
+        ISSUE_CACHE_KEY_PREFIX + issue.key,
+        issue.model_dump_json(),
+        ex=ISSUE_CACHE_TTL,
+    )
 
 
 @overload
 def get_current_issues(
     full: Literal[False] = False,
-) -> Generator[Issue, None, None]: ...
+    updated_since: datetime | None = None,
+) -> AsyncGenerator[Issue, None]: ...
 
 
 @overload
-def get_current_issues(full: Literal[True]) -> Generator[FullIssue, None, None]: ...
+def get_current_issues(
+    full: Literal[True], updated_since: datetime | None = None
+) -> AsyncGenerator[FullIssue, None]: ...
 
 
-def get_current_issues(
+async def get_current_issues(
     full: bool = False,
-) -> Generator[Issue, None, None] | Generator[FullIssue, None, None]:
-    start_at = 0
-    max_results = 1000
-    while True:
+    updated_since: datetime | None = None,
+) -> AsyncGenerator[Issue | FullIssue, None]:
+    """
+    Yield the issues the supervisor is responsible for. If updated_since is given,
+    only issues updated at or after that time are returned.
+    """
+    jql = CURRENT_ISSUES_JQL
+    if updated_since is not None:
+        # JQL absolute dates are interpreted in the timezone of the Jira user,
+        # so use a relative offset from the server's "now" instead. Rounding
+        # up to whole minutes only makes the window wider.
+        age = datetime.now(tz=updated_since.tzinfo) - updated_since
+        minutes = max(int(age.total_seconds() // 60) + 1, 1)
+        jql += f'AND updated >= "-{minutes}m"\n'
+
+    async for issue_data in _search_issues(jql, await _fields(full)):
+        yield await decode_issue(issue_data, full)
+
+
+async def _search_issues(jql: str, fields: list[str]) -> AsyncGenerator[Any, None]:
+    """
+    Yield the raw data of all issues matching jql, fetching result pages
+    concurrently.
+    """
+    # Pages are separate requests, so they need a stable order to line up.
+    # (If issues stop matching while we page, an issue can still be missed;
+    # the next collection will find it.)
+    ordered_jql = f"{jql} ORDER BY key"
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_SEARCH_PAGES)
+
+    async def fetch_page(start_at: int, max_results: int) -> dict[str, Any]:
         body = {
-            "jql": CURRENT_ISSUES_JQL,
+            "jql": ordered_jql,
             "startAt": start_at,
             "maxResults": max_results,
-            "fields": _fields(full),
+            "fields": fields,
         }
 
-        logger.debug("Fetching JIRA issues, start=%d, max=%d", start_at, max_results)
-        response_data = jira_api_post("search", json=body, decode_response=True)
+        async with semaphore:
+            logger.debug(
+                "Fetching JIRA issues, start=%d, max=%d", start_at, max_results
+            )
+            response_data = await jira_api_post(
+                "search", json=body, decode_response=True
+            )
         logger.debug("Got %d issues", len(response_data["issues"]))
+        return response_data
 
-        for issue_data in response_data["issues"]:
-            yield decode_issue(issue_data, full)
+    first_page = await fetch_page(0, SEARCH_PAGE_SIZE)
+    # The server may cap the page size below what we asked for
+    page_size = first_page.get("maxResults", SEARCH_PAGE_SIZE)
 
-        start_at += max_results
-        if response_data["total"] <= start_at:
-            break
+    # Once we know the total, request the remaining pages concurrently, but
+    # still yield the issues in page order
+    tasks = [
+        asyncio.create_task(fetch_page(start_at, page_size))
+        for start_at in range(page_size, first_page["total"], page_size)
+    ]
+    # Issues can also shift to a later page, so skip any we've already seen
+    seen_keys: set[str] = set()
+
+    def unseen(issues: list[Any]):
+        for issue_data in issues:
+            if issue_data["key"] not in seen_keys:
+                seen_keys.add(issue_data["key"])
+                yield issue_data
+
+    try:
+        for issue_data in unseen(first_page["issues"]):
+            yield issue_data
+
+        for task in tasks:
+            for issue_data in unseen((await task)["issues"]):
+                yield issue_data
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def get_issues_by_jotnar_tag(
+    project: str, with_label: str | None = None
+) -> dict[str, Issue]:
+    """
+    Get all open issues in project carrying a JOTNAR tag (optionally limited
+    to those with the label with_label), indexed by the string form of the tag.
+    This avoids a full-text search for each tag we are interested in.
+
+    If several issues carry the same tag, the first one is used, so that one
+    duplicate doesn't break the lookup for everything else.
+    """
+    jql = f"project = {project} AND status NOT IN (Done, Closed)"
+    if with_label is not None:
+        jql += f' AND labels = "{with_label}"'
+
+    result: dict[str, Issue] = {}
+    fields = await _fields(False) + ["description"]
+    async for issue_data in _search_issues(jql, fields):
+        for tag in JotnarTag.find_all(issue_data["fields"].get("description") or ""):
+            if str(tag) in result:
+                logger.warning(
+                    "Multiple open issues found with JOTNAR tag %s: %s, %s",
+                    tag,
+                    result[str(tag)].key,
+                    issue_data["key"],
+                )
+                continue
+            result[str(tag)] = await decode_issue(issue_data)
+
+    return result
 
 
 @overload
-def get_issue_by_jotnar_tag(
+async def get_issue_by_jotnar_tag(
     project: str,
     tag: JotnarTag,
     full: Literal[False] = False,
@@ -278,7 +513,7 @@ def get_issue_by_jotnar_tag(
 
 
 @overload
-def get_issue_by_jotnar_tag(
+async def get_issue_by_jotnar_tag(
     project: str,
     tag: JotnarTag,
     full: Literal[True],
@@ -286,7 +521,7 @@ def get_issue_by_jotnar_tag(
 ) -> FullIssue | None: ...
 
 
-def get_issue_by_jotnar_tag(
+async def get_issue_by_jotnar_tag(
     project: str, tag: JotnarTag, full: bool = False, with_label: str | None = None
 ) -> Issue | FullIssue | None:
     start_at = 0
@@ -299,21 +534,21 @@ def get_issue_by_jotnar_tag(
         "jql": jql,
         "startAt": 0,
         "maxResults": 2,
-        "fields": _fields(full),
+        "fields": await _fields(full),
     }
 
     logger.debug("Fetching JIRA issues, start=%d, max=%d", start_at, max_results)
-    response_data = jira_api_post("search", json=body, decode_response=True)
+    response_data = await jira_api_post("search", json=body, decode_response=True)
 
     if len(response_data["issues"]) == 0:
         return None
     elif len(response_data["issues"]) > 1:
         raise ValueError(f"Multiple open issues found with JOTNAR tag {tag}")
     else:
-        return decode_issue(response_data["issues"][0], full)
+        return await decode_issue(response_data["issues"][0], full)
 
 
-def get_issues_statuses(issue_keys: Collection[str]) -> dict[str, IssueStatus]:
+async def get_issues_statuses(issue_keys: Collection[str]) -> dict[str, IssueStatus]:
     if len(issue_keys) == 0:
         return {}
 
@@ -323,7 +558,7 @@ def get_issues_statuses(issue_keys: Collection[str]) -> dict[str, IssueStatus]:
         "fields": ["status"],
     }
 
-    response_data = jira_api_post("search", json=body, decode_response=True)
+    response_data = await jira_api_post("search", json=body, decode_response=True)
 
     return {
         issue_data["key"]: IssueStatus(issue_data["fields"]["status"]["name"])
@@ -366,7 +601,101 @@ def _add_comment_update(update: dict[str, Any], comment: CommentSpec) -> None:
     update["comment"] = [{"add": comment_dict}]
 
 
-def add_issue_comment(
+# Pending edits, per issue, while within with_coalesced_writes()
+_pending_writes = ContextVar[dict[str, list[dict[str, list[Any]]]] | None](
+    "jira_pending_writes", default=None
+)
+
+
+@asynccontextmanager
+async def with_coalesced_writes():
+    """
+    Context manager that defers comments and label changes made with the
+    functions in this module, and sends them when the context exits, merging
+    the changes to each issue into as few edits as possible. Changing the
+    status of an issue first sends the changes queued for it, so the order
+    of changes is preserved. Dry runs are logged immediately as before.
+
+    This can also be used as a decorator on async functions.
+    """
+    if _pending_writes.get() is not None:
+        yield
+        return
+
+    pending: dict[str, list[dict[str, list[Any]]]] = {}
+    token = _pending_writes.set(pending)
+    try:
+        yield
+    except BaseException:
+        _pending_writes.reset(token)
+        # Failures sending the changes are logged, but mustn't hide the
+        # exception that got us here
+        await _send_all_pending_writes(pending)
+        raise
+
+    _pending_writes.reset(token)
+    errors = await _send_all_pending_writes(pending)
+    if errors:
+        raise errors[0]
+
+
+async def _send_all_pending_writes(
+    pending: dict[str, list[dict[str, list[Any]]]],
+) -> list[Exception]:
+    """
+    Send the queued changes for every issue, even if sending some of them
+    fails. Returns the exceptions for the issues that failed.
+    """
+    errors: list[Exception] = []
+    for issue_key in list(pending):
+        try:
+            await _send_pending_writes(issue_key, pending)
+        except Exception as e:
+            logger.exception("Failed to send queued changes to %s", issue_key)
+            pending.pop(issue_key, None)
+            errors.append(e)
+
+    return errors
+
+
+def _queue_write(issue_key: str, update: dict[str, list[Any]]) -> bool:
+    """
+    Queue the operations in update for issue_key, if within
+    with_coalesced_writes(). Returns False if the caller should send them now.
+    """
+    pending = _pending_writes.get()
+    if pending is None:
+        return False
+
+    updates = pending.setdefault(issue_key, [])
+    # An edit can carry any number of label operations, but only one comment
+    if updates and not ("comment" in update and "comment" in updates[-1]):
+        for field, ops in update.items():
+            updates[-1].setdefault(field, []).extend(ops)
+    else:
+        updates.append({field: list(ops) for field, ops in update.items()})
+
+    return True
+
+
+async def _send_pending_writes(
+    issue_key: str, pending: dict[str, list[dict[str, list[Any]]]] | None = None
+) -> None:
+    if pending is None:
+        pending = _pending_writes.get()
+        if pending is None:
+            return
+
+    path = f"issue/{urlquote(issue_key)}"
+    while pending.get(issue_key):
+        update = pending[issue_key].pop(0)
+        logger.debug("Sending queued changes %s to %s", update, path)
+        await jira_api_put(path, json={"update": update})
+
+    pending.pop(issue_key, None)
+
+
+async def add_issue_comment(
     issue_key: str, comment: CommentSpec, *, dry_run: bool = False
 ) -> None:
     body = _comment_to_dict(comment)
@@ -379,22 +708,97 @@ def add_issue_comment(
         logger.debug("Dry run: would post %s to %s", body, path)
         return
 
-    jira_api_post(path, json=body)
+    if _queue_write(issue_key, {"comment": [{"add": body}]}):
+        return
+
+    await jira_api_post(path, json=body)
+
+
+# The available transitions depend on the project's workflow and the current
+# status of the issue, so when the current status is known, we can avoid
+# fetching them for each issue we transition.
+TRANSITIONS_CACHE_TTL = 60 * 60  # seconds
+
+_transitions_cache: dict[tuple[str, IssueStatus], tuple[float, list[Any]]] = {}
+
+
+async def _get_transitions(
+    issue_key: str, current_status: IssueStatus | None, *, refresh: bool = False
+) -> list[Any]:
+    cache_key = None
+    if current_status is not None:
+        cache_key = (issue_key.split("-")[0], current_status)
+        cached = _transitions_cache.get(cache_key)
+        if (
+            not refresh
+            and cached is not None
+            and time.monotonic() - cached[0] < TRANSITIONS_CACHE_TTL
+        ):
+            return cached[1]
+
+    path = f"issue/{urlquote(issue_key)}/transitions"
+    response_data = await jira_api_get(path, params={"expand": "transitions.fields"})
+    transitions = response_data["transitions"]
+
+    if cache_key is not None:
+        _transitions_cache[cache_key] = (time.monotonic(), transitions)
+
+    return transitions
 
 
-def change_issue_status(
+async def change_issue_status(
     issue_key: str,
     new_status: IssueStatus,
     comment: CommentSpec = None,
     *,
+    current_status: IssueStatus | None = None,
     dry_run: bool = False,
 ) -> None:
-    path = f"issue/{urlquote(issue_key)}/transitions"
-    response_data = jira_api_get(path, params={"expand": "transitions.fields"})
+    """
+    Transition an issue to new_status. If current_status is passed, the
+    transitions available from that status may come from a cache; if the
+    cached transition turns out not to apply to this issue, they are
+    fetched again and the transition is retried.
+    """
+    await _send_pending_writes(issue_key)
+
+    transitions = await _get_transitions(issue_key, current_status)
+    try:
+        can_transition_with_comment = await _transition_issue(
+            issue_key, new_status, transitions, comment, dry_run=dry_run
+        )
+    except (ValueError, aiohttp.ClientResponseError) as e:
+        if current_status is None or (
+            isinstance(e, aiohttp.ClientResponseError) and e.status != 400
+        ):
+            raise
+
+        logger.info(
+            "Transitioning %s to %s failed (%s), refreshing transitions",
+            issue_key,
+            new_status,
+            e,
+        )
+        transitions = await _get_transitions(issue_key, current_status, refresh=True)
+        can_transition_with_comment = await _transition_issue(
+            issue_key, new_status, transitions, comment, dry_run=dry_run
+        )
 
+    if comment is not None and not can_transition_with_comment:
+        await add_issue_comment(issue_key, comment, dry_run=dry_run)
+
+
+async def _transition_issue(
+    issue_key: str,
+    new_status: IssueStatus,
+    transitions: list[Any],
+    comment: CommentSpec,
+    *,
+    dry_run: bool,
+) -> bool:
     status_str = str(new_status)
     transition = None
-    for t in response_data["transitions"]:
+    for t in transitions:
         if t["to"]["name"] == status_str:
             transition = t
             break
@@ -422,13 +826,12 @@ def change_issue_status(
         logger.debug("Dry run: would post %s to %s", body, path)
 
     if not dry_run:
-        jira_api_post(path, json=body)
+        await jira_api_post(path, json=body)
 
-    if comment is not None and not can_transition_with_comment:
-        add_issue_comment(issue_key, comment, dry_run=dry_run)
+    return can_transition_with_comment
 
 
-def add_issue_label(
+async def add_issue_label(
     issue_key: str, label: str, comment: CommentSpec = None, *, dry_run: bool = False
 ) -> None:
     path = f"issue/{urlquote(issue_key)}"
@@ -443,21 +846,34 @@ def add_issue_label(
         logger.debug("Dry run: would post %s to %s", body, path)
         return
 
-    jira_api_put(path, json=body)
+    if _queue_write(issue_key, body["update"]):
+        return
 
+    await jira_api_put(path, json=body)
 
-@cache
-def get_user_name(email: str) -> str:
-    users = jira_api_get("user/search", params={"username": email})
-    if len(users) == 0:
-        raise ValueError(f"No JIRA user with email {email}")
-    elif len(users) > 1:
-        raise ValueError(f"Multiple JIRA users with email {email}")
-    return users[0]["key"]
+
+_user_names: dict[str, str] = {}
+
+
+async def get_user_name(email: str) -> str:
+    if email in _user_names:
+        return _user_names[email]
+
+    async def fetch() -> str:
+        users = await jira_api_get("user/search", params={"username": email})
+        if len(users) == 0:
+            raise ValueError(f"No JIRA user with email {email}")
+        elif len(users) > 1:
+            raise ValueError(f"Multiple JIRA users with email {email}")
+
+        return users[0]["key"]
+
+    _user_names[email] = await _get_jira_metadata(f"user_name:{email}", fetch)
+    return _user_names[email]
 
 
 @overload
-def create_issue(
+async def create_issue(
     *,
     project: str,
     summary: str,
@@ -473,7 +889,7 @@ def create_issue(
 
 
 @overload
-def create_issue(
+async def create_issue(
     *,
     project: str,
     summary: str,
@@ -488,7 +904,7 @@ def create_issue(
 ) -> None: ...
 
 
-def create_issue(
+async def create_issue(
     *,
     project: str,
     summary: str,
@@ -512,10 +928,10 @@ def create_issue(
     }
 
     if assignee_email:
-        fields |= {"assignee": {"name": get_user_name(assignee_email)}}
+        fields |= {"assignee": {"name": await get_user_name(assignee_email)}}
 
     if reporter_email:
-        fields |= {"reporter": {"name": get_user_name(reporter_email)}}
+        fields |= {"reporter": {"name": await get_user_name(reporter_email)}}
 
     if components:
         fields |= {"components": [{"name": c} for c in components]}
@@ -539,7 +955,7 @@ def create_issue(
         logger.debug("Dry run: would post %s to %s", body, path)
         return
 
-    response_data = jira_api_post(path, json=body, decode_response=True)
+    response_data = await jira_api_post(path, json=body, decode_response=True)
     key = response_data["key"]
     logger.info("Created new issue %s", key)
 
@@ -547,4 +963,10 @@ def create_issue(
 
 
 if __name__ == "__main__":
-    print(get_issue(os.environ["JIRA_ISSUE"], full=True).model_dump_json())
+
+    @with_http_sessions()
+    async def main():
+        issue = await get_issue(os.environ["JIRA_ISSUE"], full=True)
+        print(issue.model_dump_json())
+
+    asyncio.run(main())
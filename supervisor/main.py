@@ -1,4 +1,6 @@
 import asyncio
+from contextlib import suppress
+from datetime import datetime, timezone
 import logging
 import os
 import re
@@ -6,18 +8,35 @@ import re
 from attr import dataclass
 import typer
 
-from agents.observability import setup_observability
+from agents.observability import setup_metrics, setup_observability
 from common.utils import init_kerberos_ticket
-from .errata_utils import get_erratum, get_erratum_for_link
+from .errata_utils import get_erratum, get_errata_for_links
+from .cycle_cache import with_cycle_cache
 from .erratum_handler import ErratumHandler, erratum_needs_attention
 from .issue_handler import IssueHandler
-from .jira_utils import get_current_issues, get_issue
+from .jira_utils import get_current_issues, get_issue, with_coalesced_writes
 from .supervisor_types import ErrataStatus, IssueStatus
 from .http_utils import with_http_sessions
+from .redis_utils import with_redis_client, with_redis_from_env
 from .work_queue import WorkItem, WorkQueue, WorkItemType, work_queue
 
 logger = logging.getLogger(__name__)
 
+METRICS_UPDATE_INTERVAL = 60  # seconds
+
+# Redis keys recording the start time of the last successful collection and
+# of the last full (non-incremental) collection, as Unix timestamps
+COLLECT_WATERMARK_KEY = "supervisor_collect_watermark"
+COLLECT_LAST_FULL_KEY = "supervisor_collect_last_full"
+# Incremental collections overlap the previous one by this much, to cover
+# clock skew against Jira and issues updated while the previous query ran
+COLLECT_WATERMARK_OVERLAP = 300  # seconds
+# Errata can need work without any of their issues changing (e.g., when the
+# issue flagging one for attention is closed), so incremental collections
+# also check the errata of all the issues seen by the last full collection
+# (and incremental collections since), which are kept in this set.
+COLLECT_ERRATA_LINKS_KEY = "supervisor_collect_errata_links"
+
 
 app = typer.Typer()
 
@@ -25,6 +44,7 @@ app = typer.Typer()
 @dataclass
 class State:
     dry_run: bool = False
+    metrics_enabled: bool = False
 
 
 app_state = State()
@@ -57,74 +77,137 @@ def check_env(chat: bool = False, jira: bool = False, redis: bool = False):
         raise typer.Exit(1)
 
 
+async def get_collect_watermark(queue: WorkQueue, full_interval: int) -> float | None:
+    """
+    Returns the timestamp to collect updated issues from, or None if a full
+    collection is needed.
+    """
+    if full_interval <= 0:
+        return None
+
+    watermark, last_full = await queue.client.mget(
+        COLLECT_WATERMARK_KEY, COLLECT_LAST_FULL_KEY
+    )
+    if watermark is None or last_full is None:
+        return None
+    if datetime.now().timestamp() - float(last_full) >= full_interval:
+        return None
+
+    return float(watermark) - COLLECT_WATERMARK_OVERLAP
+
+
 @with_http_sessions()
-async def collect_once(queue: WorkQueue):
+@with_cycle_cache()
+async def collect_once(queue: WorkQueue, full_interval: int):
     await init_kerberos_ticket()
 
-    logger.info("Getting all relevant issues from JIRA")
-    issues = [i for i in get_current_issues()]
+    # In case the number of shards was reduced
+    await queue.migrate_removed_shards()
+
+    started_at = datetime.now().timestamp()
+    updated_since = await get_collect_watermark(queue, full_interval)
+    if updated_since is None:
+        logger.info("Getting all relevant issues from JIRA")
+        issues = [i async for i in get_current_issues()]
+    else:
+        since = datetime.fromtimestamp(updated_since, tz=timezone.utc)
+        logger.info("Getting relevant issues updated since %s from JIRA", since)
+        issues = [i async for i in get_current_issues(updated_since=since)]
 
     erratum_links = set(i.errata_link for i in issues if i.errata_link is not None)
-    errata = [get_erratum_for_link(link) for link in erratum_links]
+    if updated_since is not None:
+        known_links = await queue.client.smembers(COLLECT_ERRATA_LINKS_KEY)
+        erratum_links |= {link.decode() for link in known_links}
+    errata = await get_errata_for_links(erratum_links)
 
     work_items = set(
         WorkItem(item_type=WorkItemType.PROCESS_ISSUE, item_data=i.key)
         for i in issues
         if i.status != IssueStatus.RELEASE_PENDING
-    ) | set(
-        WorkItem(item_type=WorkItemType.PROCESS_ERRATUM, item_data=str(e.id))
-        for e in errata
+    )
+    for e in errata:
         if (
-            (
-                e.status == ErrataStatus.NEW_FILES
-                or (e.status == ErrataStatus.QE and e.all_issues_release_pending)
+            e.status == ErrataStatus.NEW_FILES
+            or (e.status == ErrataStatus.QE and e.all_issues_release_pending)
+        ) and not await erratum_needs_attention(e.id):
+            work_items.add(
+                WorkItem(item_type=WorkItemType.PROCESS_ERRATUM, item_data=str(e.id))
             )
-            and not erratum_needs_attention(e.id)
-        )
-    )
 
-    new_work_items = work_items - set(await queue.get_all_work_items())
-    await queue.schedule_work_items(new_work_items)
+    new_work_items = await queue.schedule_work_items(work_items, only_new=True)
 
     for new_work_item in new_work_items:
         logger.info("New work item: %s", new_work_item)
 
     logger.info("Scheduled %d new work items", len(new_work_items))
 
-
-async def do_collect(repeat: bool, repeat_delay: int):
-    async with work_queue(os.environ["REDIS_URL"]) as queue:
+    # Only advance the watermark once everything found has been scheduled,
+    # so a failed collection is retried from the same point
+    mapping = {COLLECT_WATERMARK_KEY: started_at}
+    if updated_since is None:
+        mapping[COLLECT_LAST_FULL_KEY] = started_at
+    async with queue.client.pipeline(transaction=True) as pipe:
+        pipe.mset(mapping)
+        # A full collection starts the set of errata over, so it doesn't grow
+        # without bound
+        if updated_since is None:
+            pipe.delete(COLLECT_ERRATA_LINKS_KEY)
+        if erratum_links:
+            pipe.sadd(COLLECT_ERRATA_LINKS_KEY, *erratum_links)
+        await pipe.execute()
+
+
+async def do_collect(repeat: bool, repeat_delay: int, full_interval: int):
+    async with (
+        work_queue(os.environ["REDIS_URL"]) as queue,
+        with_redis_client(queue.client),
+    ):
         while repeat:
             try:
-                await collect_once(queue)
+                await collect_once(queue, full_interval)
+                if app_state.metrics_enabled:
+                    await queue.update_metrics()
             except Exception:
                 logger.exception("Error while collecting work items")
             await asyncio.sleep(repeat_delay)
         else:
-            await collect_once(queue)
+            await collect_once(queue, full_interval)
+            if app_state.metrics_enabled:
+                await queue.update_metrics()
 
 
 @app.command()
 def collect(
     repeat: bool = typer.Option(True),
     repeat_delay: int = typer.Option(1200, "--repeat-delay"),
+    full_interval: int = typer.Option(
+        6 * 60 * 60,
+        "--full-interval",
+        help="Seconds between full collections; in between, only issues updated "
+        "since the last collection are fetched. 0 always does a full collection.",
+    ),
 ):
     check_env(jira=True, redis=True)
 
-    asyncio.run(do_collect(repeat, repeat_delay))
+    asyncio.run(do_collect(repeat, repeat_delay, full_interval))
 
 
 @with_http_sessions()
+@with_cycle_cache()
 async def process_once(queue: WorkQueue):
-    work_item = await queue.wait_first_ready_work_item()
+    async with queue.claim_first_ready_work_item() as work_item:
+        await process_work_item(queue, work_item)
 
+
+async def process_work_item(queue: WorkQueue, work_item: WorkItem):
     # Calling this on every work item is a little inefficient, but it makes
     # sure that we'll get a new ticket if the old one expires.
     await init_kerberos_ticket()
 
     if work_item.item_type == WorkItemType.PROCESS_ISSUE:
-        issue = get_issue(work_item.item_data, full=True)
-        result = await IssueHandler(issue, dry_run=app_state.dry_run).run()
+        issue = await get_issue(work_item.item_data, full=True)
+        async with with_coalesced_writes():
+            result = await IssueHandler(issue, dry_run=app_state.dry_run).run()
         if result.reschedule_in >= 0:
             await queue.schedule_work_items([work_item], delay=result.reschedule_in)
         else:
@@ -137,8 +220,10 @@ async def process_once(queue: WorkQueue):
             result.reschedule_in if result.reschedule_in >= 0 else "never",
         )
     elif work_item.item_type == WorkItemType.PROCESS_ERRATUM:
-        erratum = get_erratum(work_item.item_data)
-        result = await ErratumHandler(erratum, dry_run=app_state.dry_run).run()
+        # Errata Tool calls are synchronous, so keep them off the event loop
+        erratum = await asyncio.to_thread(get_erratum, work_item.item_data)
+        async with with_coalesced_writes():
+            result = await ErratumHandler(erratum, dry_run=app_state.dry_run).run()
         if result.reschedule_in >= 0:
             await queue.schedule_work_items([work_item], delay=result.reschedule_in)
         else:
@@ -155,31 +240,74 @@ async def process_once(queue: WorkQueue):
         logger.warning("Unknown work item type: %s", work_item)
 
 
-async def do_process(repeat: bool):
-    async with work_queue(os.environ["REDIS_URL"]) as queue:
-        while repeat:
+async def process_loop(queue: WorkQueue):
+    while True:
+        try:
+            await process_once(queue)
+        except Exception:
+            logger.exception("Error while processing work item")
+            await asyncio.sleep(60)
+
+
+async def update_metrics_loop(queue: WorkQueue):
+    while True:
+        try:
+            await queue.update_metrics()
+        except Exception:
+            logger.exception("Error while updating work queue metrics")
+        await asyncio.sleep(METRICS_UPDATE_INTERVAL)
+
+
+async def do_process(repeat: bool, concurrency: int):
+    # The HTTP sessions are set up here so that they are shared between workers
+    async with (
+        work_queue(os.environ["REDIS_URL"]) as queue,
+        with_http_sessions(),
+        with_redis_client(queue.client),
+    ):
+        if repeat:
+            async with asyncio.TaskGroup() as tg:
+                for _ in range(concurrency):
+                    tg.create_task(process_loop(queue))
+                if app_state.metrics_enabled:
+                    tg.create_task(update_metrics_loop(queue))
+                if queue.n_shards > 1:
+                    tg.create_task(queue.maintain_shard_membership())
+        elif queue.n_shards > 1:
+            # Get our shards before looking for work, then keep them up to date
+            await queue.update_shard_membership()
+            membership_task = asyncio.create_task(queue.maintain_shard_membership())
             try:
                 await process_once(queue)
-            except Exception:
-                logger.exception("Error while processing work item")
-                await asyncio.sleep(60)
+            finally:
+                membership_task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await membership_task
         else:
             await process_once(queue)
 
 
 @app.command()
-def process(repeat: bool = typer.Option(True)):
+def process(
+    repeat: bool = typer.Option(True),
+    concurrency: int = typer.Option(
+        1, "--concurrency", min=1, help="Number of work items to process in parallel."
+    ),
+):
     check_env(chat=True, jira=True, redis=True)
 
-    asyncio.run(do_process(repeat))
+    asyncio.run(do_process(repeat, concurrency))
 
 
 @with_http_sessions()
+@with_redis_from_env()
+@with_cycle_cache()
 async def do_process_issue(key: str):
     await init_kerberos_ticket()
 
-    issue = get_issue(key, full=True)
-    result = await IssueHandler(issue, dry_run=app_state.dry_run).run()
+    issue = await get_issue(key, full=True)
+    async with with_coalesced_writes():
+        result = await IssueHandler(issue, dry_run=app_state.dry_run).run()
     logger.info(
         "Issue %s processed, status=%s, reschedule_in=%s",
         key,
@@ -209,11 +337,14 @@ def process_issue(
 
 
 @with_http_sessions()
+@with_redis_from_env()
+@with_cycle_cache()
 async def do_process_erratum(id: str):
     await init_kerberos_ticket()
 
-    erratum = get_erratum(id)
-    result = await ErratumHandler(erratum, dry_run=app_state.dry_run).run()
+    erratum = await asyncio.to_thread(get_erratum, id)
+    async with with_coalesced_writes():
+        result = await ErratumHandler(erratum, dry_run=app_state.dry_run).run()
 
     logger.info(
         "Erratum %s (%s) processed, status=%s, reschedule_in=%s",
@@ -247,6 +378,9 @@ def main(
     dry_run: bool = typer.Option(
         False, "--dry-run", help="Don't actually change anything."
     ),
+    metrics_port: int | None = typer.Option(
+        None, "--metrics-port", help="Serve Prometheus metrics on this port."
+    ),
 ):
     if debug:
         logging.basicConfig(level=logging.DEBUG)
@@ -261,6 +395,11 @@ def main(
     if collector_endpoint is not None:
         setup_observability(collector_endpoint)
 
+    metrics_endpoint = os.environ.get("METRICS_ENDPOINT")
+    if metrics_endpoint is not None or metrics_port is not None:
+        setup_metrics(metrics_endpoint, metrics_port)
+        app_state.metrics_enabled = True
+
 
 if __name__ == "__main__":
     app()
@@ -0,0 +1,68 @@
+from contextlib import AsyncExitStack, asynccontextmanager
+from contextvars import ContextVar
+import logging
+import os
+
+import redis.asyncio as redis
+
+from common.utils import redis_client as common_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+# The collector and processor already hold a Redis connection for the work
+# queue; making it available through a context variable lets lower level
+# helpers (like jira_utils) share it for caching without passing it through
+# every call. Code running without Redis (e.g. process-issue) simply doesn't
+# get the caching.
+
+
+_redis_client = ContextVar[redis.Redis | None]("redis_client", default=None)
+
+
+@asynccontextmanager
+async def with_redis_client(client: redis.Redis):
+    """
+    Context manager that makes client the current Redis client for
+    the enclosed code.
+    """
+    token = _redis_client.set(client)
+    try:
+        yield client
+    finally:
+        _redis_client.reset(token)
+
+
+def current_redis_client() -> redis.Redis | None:
+    """
+    Get the current Redis client, or None if the enclosing code didn't
+    set one up with with_redis_client().
+    """
+    return _redis_client.get()
+
+
+@asynccontextmanager
+async def with_redis_from_env():
+    """
+    Like with_redis_client(), but connects to $REDIS_URL, if it is set.
+    For commands where Redis is optional, and only used for caching, so
+    if Redis can't be reached, the enclosed code runs without it.
+
+    This can also be used as a decorator on async functions.
+    """
+    redis_url = os.environ.get("REDIS_URL")
+    if redis_url is None or _redis_client.get() is not None:
+        yield _redis_client.get()
+        return
+
+    async with AsyncExitStack() as stack:
+        # Only connection failures are caught, not errors from the enclosed code
+        try:
+            client = await stack.enter_async_context(common_redis_client(redis_url))
+        except redis.ConnectionError as e:
+            logger.warning("Can't connect to Redis, continuing without caching: %s", e)
+            yield None
+            return
+
+        async with with_redis_client(client):
+            yield client
@@ -1,5 +1,6 @@
 from datetime import datetime
 from enum import StrEnum
+import re
 from typing import Optional
 
 from pydantic import BaseModel, Field
@@ -96,6 +97,7 @@ class Issue(BaseModel):
     fixed_in_build: str | None = None  # RHEL only
     test_coverage: list[TestCoverage] | None = None  # RHEL only
     preliminary_testing: PreliminaryTesting | None = None  # RHEL only
+    updated: datetime | None = None
 
 
 class FullIssue(Issue):
@@ -119,6 +121,14 @@ class JotnarTag(BaseModel):
     def __str__(self) -> str:
         return f"::: JOTNAR {self.type} E: {self.id.strip()} :::"
 
+    @classmethod
+    def find_all(cls, text: str) -> list["JotnarTag"]:
+        """Find all the tags in text (e.g. an issue description)"""
+        return [
+            cls(type=m.group(1), resource="erratum", id=m.group(2))
+            for m in re.finditer(r"::: JOTNAR (needs_attention) E: (\S+) :::", text)
+        ]
+
 
 class TestingState(StrEnum):
     NOT_RUNNING = "tests-not-running"
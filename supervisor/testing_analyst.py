@@ -1,8 +1,12 @@
+import asyncio
+import hashlib
+import json
 import logging
 import os
+import re
 from datetime import datetime, timezone
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 
 from beeai_framework.agents.tool_calling import ToolCallingAgent
 from beeai_framework.backend import ChatModel
@@ -11,10 +15,18 @@ from beeai_framework.template import PromptTemplate, PromptTemplateInput
 
 from agents.utils import get_agent_execution_config
 from .qe_data import get_qe_data, TestLocationInfo
+from .redis_utils import current_redis_client
 from .supervisor_types import FullErratum, FullIssue, TestingState
 from .tools.read_readme import ReadReadmeTool
 from .tools.read_issue import ReadIssueTool
-from .tools.search_resultsdb import SearchResultsdbTool
+from .tools.search_resultsdb import (
+    IN_PROGRESS_OUTCOMES,
+    ResultsDbResult,
+    ResultsdbOutput,
+    SearchResultsdbTool,
+    get_latest_submit_time,
+    search_resultsdb,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -75,7 +87,205 @@ def render_prompt(input: InputSchema) -> str:
     ).render(input)
 
 
+# Many components report all their gating tests to resultsdb, and when
+# the results are clear-cut, there's no need to ask the agent to interpret
+# them. The QE data lists the testcases as "resultsdb: <pattern>, ..." in
+# test_result_location, with patterns in the syntax of search_resultsdb()
+# (see README-supervisor.md). Results alone can't tell us whether all the
+# expected tests have reported, so we never decide that tests passed this
+# way - that's left to the agent.
+RESULTSDB_LOCATION_RE = re.compile(r"resultsdb:\s*([\w.%-]+(?:\s*,\s*[\w.%-]+)*)", re.I)
+
+# Outcomes that don't affect the overall result
+RESULTSDB_IGNORED = {ResultsdbOutput.INFO, ResultsdbOutput.NOT_APPLICABLE}
+
+
+def resultsdb_patterns(test_location_info: TestLocationInfo) -> list[str]:
+    location = test_location_info.test_result_location
+    if location is None:
+        return []
+
+    return [
+        pattern.strip()
+        for match in RESULTSDB_LOCATION_RE.finditer(location)
+        for pattern in match.group(1).split(",")
+    ]
+
+
+def format_results(results: list[ResultsDbResult]) -> str:
+    return "\n".join(
+        f"* [{r.testcase_name}|{r.ref_url}]: {r.outcome}"
+        if r.ref_url
+        else f"* {r.testcase_name}: {r.outcome}"
+        for r in sorted(results, key=lambda r: r.testcase_name)
+    )
+
+
+def classify_resultsdb_results(results: list[ResultsDbResult]) -> OutputSchema | None:
+    """
+    Determine the testing state from resultsdb results, if they are
+    unambiguous: any failed, or the rest still in progress. Returns None
+    if the agent needs to look at the results.
+    """
+    outcomes = {r.outcome for r in results} - RESULTSDB_IGNORED
+    if not outcomes:
+        return None
+
+    if ResultsdbOutput.FAILED in outcomes:
+        failed = [r for r in results if r.outcome == ResultsdbOutput.FAILED]
+        return OutputSchema(
+            state=TestingState.FAILED,
+            comment="The following tests failed:\n" + format_results(failed),
+        )
+
+    if not outcomes <= {ResultsdbOutput.PASSED} | IN_PROGRESS_OUTCOMES:
+        # ERROR, NEEDS_INSPECTION
+        return None
+
+    if outcomes == {ResultsdbOutput.PASSED}:
+        # More tests might still be coming
+        return None
+
+    if ResultsdbOutput.RUNNING in outcomes or ResultsdbOutput.PASSED in outcomes:
+        return OutputSchema(
+            state=TestingState.RUNNING,
+            comment="Tests are running:\n" + format_results(results),
+        )
+
+    return OutputSchema(
+        state=TestingState.PENDING,
+        comment="Tests are queued:\n" + format_results(results),
+    )
+
+
+async def analyze_resultsdb(
+    jira_issue: FullIssue, test_location_info: TestLocationInfo
+) -> OutputSchema | None:
+    """
+    The fast path of analyze_issue(): returns the testing state based only
+    on resultsdb, or None if that's not possible.
+    """
+    patterns = resultsdb_patterns(test_location_info)
+    if not patterns or jira_issue.fixed_in_build is None:
+        return None
+
+    try:
+        results_lists = await asyncio.gather(
+            *(
+                search_resultsdb(jira_issue.fixed_in_build, pattern)
+                for pattern in patterns
+            )
+        )
+    except Exception:
+        logger.warning(
+            "Can't fetch resultsdb results for %s", jira_issue.key, exc_info=True
+        )
+        return None
+
+    # A pattern without results means that tests haven't been started (yet?)
+    if not all(results_lists):
+        return None
+
+    # Patterns might overlap
+    results = list(
+        {r.testcase_name: r for rs in results_lists for r in rs}.values()
+    )
+    return classify_resultsdb_results(results)
+
+
+# While tests are pending or running, the same issue is analyzed over and
+# over, usually with nothing having changed. So we remember (in Redis, when
+# available) a fingerprint of the inputs to the analysis along with its
+# result, and reuse the result while the fingerprint stays the same. Since
+# the agent also considers how much time has passed, we still redo the
+# analysis after ANALYSIS_MEMO_MAX_AGE.
+ANALYSIS_MEMO_KEY_PREFIX = "supervisor_testing_analysis:"
+ANALYSIS_MEMO_MAX_AGE = 6 * 60 * 60  # seconds
+
+
+class AnalysisMemo(BaseModel):
+    fingerprint: str
+    output: OutputSchema
+    analyzed_at: datetime
+
+
+async def analysis_fingerprint(
+    jira_issue: FullIssue,
+    erratum: FullErratum | None,
+    test_location_info: TestLocationInfo,
+) -> str:
+    comments = (erratum.comments or []) if erratum else []
+    inputs = {
+        "issue_updated": jira_issue.updated,
+        "erratum_status": erratum.status if erratum else None,
+        "erratum_comment_count": len(comments),
+        "erratum_last_comment": max((c.created for c in comments), default=None),
+        "test_location_info": test_location_info.model_dump(),
+        "latest_result": (
+            await get_latest_submit_time(jira_issue.fixed_in_build)
+            if jira_issue.fixed_in_build
+            else None
+        ),
+    }
+    return hashlib.sha256(
+        json.dumps(inputs, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
 async def analyze_issue(jira_issue: FullIssue, erratum: FullErratum | None) -> OutputSchema:
+    test_location_info = await get_qe_data(jira_issue.components[0])
+
+    output = await analyze_resultsdb(jira_issue, test_location_info)
+    if output is not None:
+        logger.info(
+            "Determined testing state of %s from resultsdb: %s",
+            jira_issue.key,
+            output.model_dump_json(indent=4),
+        )
+        return output
+
+    client = current_redis_client()
+    memo_key = ANALYSIS_MEMO_KEY_PREFIX + jira_issue.key
+    fingerprint = None
+    if client is not None and jira_issue.updated is not None:
+        try:
+            fingerprint = await analysis_fingerprint(
+                jira_issue, erratum, test_location_info
+            )
+        except Exception:
+            logger.warning(
+                "Can't compute analysis fingerprint for %s",
+                jira_issue.key,
+                exc_info=True,
+            )
+
+    if client is not None and fingerprint is not None:
+        memo_data = await client.get(memo_key)
+        memo: AnalysisMemo | None = None
+        if memo_data is not None:
+            try:
+                memo = AnalysisMemo.model_validate_json(memo_data)
+            except ValidationError:
+                logger.debug(
+                    "Discarding invalid analysis memo for %s",
+                    jira_issue.key,
+                    exc_info=True,
+                )
+                await client.delete(memo_key)
+        if memo is not None:
+            age = datetime.now(timezone.utc) - memo.analyzed_at
+            if (
+                memo.fingerprint == fingerprint
+                and age.total_seconds() < ANALYSIS_MEMO_MAX_AGE
+            ):
+                logger.info(
+                    "Inputs for %s unchanged since %s, reusing analysis: %s",
+                    jira_issue.key,
+                    memo.analyzed_at,
+                    memo.output.model_dump_json(indent=4),
+                )
+                return memo.output
+
     agent = ToolCallingAgent(
         llm=ChatModel.from_name(
             os.environ["CHAT_MODEL"],
@@ -95,13 +305,21 @@ async def analyze_issue(jira_issue: FullIssue, erratum: FullErratum | None) -> O
             raise ValueError("Agent did not return a result")
         return OutputSchema.model_validate_json(response.state.result.text)
 
+    current_time = datetime.now(timezone.utc)
     output = await run(
         InputSchema(
             issue=jira_issue,
-            test_location_info=await get_qe_data(jira_issue.components[0]),
+            test_location_info=test_location_info,
             erratum=erratum,
-            current_time=datetime.now(timezone.utc),
+            current_time=current_time,
         )
     )
     logger.info(f"Direct run completed: {output.model_dump_json(indent=4)}")
+
+    if client is not None and fingerprint is not None:
+        memo = AnalysisMemo(
+            fingerprint=fingerprint, output=output, analyzed_at=current_time
+        )
+        await client.set(memo_key, memo.model_dump_json(), ex=ANALYSIS_MEMO_MAX_AGE)
+
     return output
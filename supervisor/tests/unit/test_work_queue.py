@@ -0,0 +1,53 @@
+import pytest
+
+from supervisor.work_queue import (
+    WorkItem,
+    WorkItemPriority,
+    WorkItemType,
+    WorkQueue,
+    lane_key,
+)
+
+# The work queue is built on Lua scripts
+pytest.importorskip("lupa")
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def issue(key: str) -> WorkItem:
+    return WorkItem(item_type=WorkItemType.PROCESS_ISSUE, item_data=key)
+
+
+@pytest.mark.asyncio
+async def test_pop_ready_work_items_across_shards():
+    client = fakeredis.aioredis.FakeRedis()
+    queue = WorkQueue(client, n_shards=2)
+    queue.owned_shards = [0, 1]
+
+    normal = WorkItemPriority.NORMAL
+    await client.zadd(
+        lane_key(normal, 0), {"process_issue:A-1": 100, "process_issue:A-3": 300}
+    )
+    await client.zadd(
+        lane_key(normal, 1), {"process_issue:A-2": 200, "process_issue:A-4": 400}
+    )
+    await client.zadd(
+        lane_key(WorkItemPriority.HIGH, 1), {"process_issue:A-5": 500}
+    )
+
+    # Higher priority first, then the oldest items of all shards
+    leases = await queue.pop_ready_work_items(4)
+    assert [(lease.work_item, lease.shard, lease.ready_at) for lease in leases] == [
+        (issue("A-5"), 1, 500),
+        (issue("A-1"), 0, 100),
+        (issue("A-2"), 1, 200),
+        (issue("A-3"), 0, 300),
+    ]
+    assert leases[1].priority == normal
+    assert await client.zscore(lane_key(normal, 0), "process_issue:A-1") == (
+        leases[1].expires_at
+    )
+
+    # The leased items aren't ready again until their leases expire
+    leases = await queue.pop_ready_work_items(4)
+    assert [lease.work_item for lease in leases] == [issue("A-4")]
+    assert await queue.pop_ready_work_items(4) == []
@@ -33,7 +33,7 @@ class ReadIssueTool(Tool[ReadIssueInput, ToolRunOptions, StringToolOutput]):
     ) -> StringToolOutput:
         try:
             #fetch the issue using jira utils
-            issue = get_issue(input.issue_key, full=True)
+            issue = await get_issue(input.issue_key, full=True)
 
             #return formatted issue data
             return StringToolOutput(
@@ -1,10 +1,18 @@
-from pydantic import BaseModel, Field
+import logging
+
+from pydantic import BaseModel, Field, ValidationError
 
 from beeai_framework.context import RunContext
 from beeai_framework.emitter import Emitter
 from beeai_framework.tools import StringToolOutput, Tool, ToolRunOptions
 
+from common.async_cache import cache_async
+
 from ..http_utils import aiohttp_session
+from ..redis_utils import current_redis_client
+
+
+logger = logging.getLogger(__name__)
 
 
 class ReadReadmeInput(BaseModel):
@@ -21,6 +29,94 @@ README_PATTERNS = [
 ]
 
 
+# The testing analyst reads the READMEs of the same few test repositories
+# over and over, and they rarely change. Besides keeping them in memory, we
+# store them in Redis, when available, along with the URL that worked and
+# its validators, so that checking for changes is a conditional GET of a
+# single URL.
+README_CACHE_KEY_PREFIX = "supervisor_readme:"
+README_CACHE_TTL = 30 * 24 * 60 * 60  # seconds
+
+
+class CachedReadme(BaseModel):
+    url: str
+    etag: str | None = None
+    last_modified: str | None = None
+    text: str
+
+
+async def _revalidate_readme(cached: CachedReadme) -> CachedReadme | None:
+    headers = {}
+    if cached.etag is not None:
+        headers["If-None-Match"] = cached.etag
+    if cached.last_modified is not None:
+        headers["If-Modified-Since"] = cached.last_modified
+
+    async with aiohttp_session().get(cached.url, headers=headers) as response:
+        if response.status == 304:
+            return cached
+        if response.status == 200:
+            return CachedReadme(
+                url=cached.url,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+                text=await response.text(),
+            )
+
+    return None
+
+
+async def _fetch_readme(repo_url: str) -> CachedReadme | None:
+    session = aiohttp_session()
+
+    for prefix, suffix in README_PATTERNS:
+        if repo_url.startswith(prefix):
+            url = repo_url.removesuffix("/") + suffix
+            async with session.get(url) as response:
+                if response.status == 200:
+                    return CachedReadme(
+                        url=url,
+                        etag=response.headers.get("ETag"),
+                        last_modified=response.headers.get("Last-Modified"),
+                        text=await response.text(),
+                    )
+
+    return None
+
+
+@cache_async(max_age=10 * 60, max_entries=256, stale_while_revalidate=24 * 60 * 60)
+async def read_readme(repo_url: str) -> str | None:
+    client = current_redis_client()
+    cache_key = README_CACHE_KEY_PREFIX + repo_url
+
+    readme = None
+    if client is not None:
+        cached_data = await client.get(cache_key)
+        cached: CachedReadme | None = None
+        if cached_data is not None:
+            try:
+                cached = CachedReadme.model_validate_json(cached_data)
+            except ValidationError:
+                logger.debug(
+                    "Discarding invalid cached README for %s", repo_url, exc_info=True
+                )
+                await client.delete(cache_key)
+        if cached is not None:
+            readme = await _revalidate_readme(cached)
+            if readme is None:
+                logger.debug("Cached README URL for %s no longer works", repo_url)
+
+    if readme is None:
+        readme = await _fetch_readme(repo_url)
+        if readme is None:
+            return None
+
+    if client is not None:
+        await client.set(cache_key, readme.model_dump_json(), ex=README_CACHE_TTL)
+
+    return readme.text
+
+
 class ReadReadmeTool(Tool[ReadReadmeInput, ToolRunOptions, StringToolOutput]):
     name = "read_readme"  # type: ignore
     description = "Read README file from git repository"  # type: ignore
@@ -38,16 +134,8 @@ class ReadReadmeTool(Tool[ReadReadmeInput, ToolRunOptions, StringToolOutput]):
         options: ToolRunOptions | None,
         context: RunContext,
     ) -> StringToolOutput:
-        session = aiohttp_session()
-
-        url = None
-        for prefix, suffix in README_PATTERNS:
-            if input.repo_url.startswith(prefix):
-                url = input.repo_url.removesuffix("/") + suffix
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        return StringToolOutput(
-                            result=await response.text(),
-                        )
+        readme = await read_readme(input.repo_url)
+        if readme is not None:
+            return StringToolOutput(result=readme)
 
         return StringToolOutput(result=f"Failed to find README.md for {input.repo_url}")
@@ -1,16 +1,20 @@
 from datetime import datetime
 from enum import StrEnum
 import logging
+from typing import Any, AsyncGenerator
 from urllib.parse import quote as urlquote
 
 from aiohttp import client_exceptions
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 
 from beeai_framework.context import RunContext
 from beeai_framework.emitter import Emitter
 from beeai_framework.tools import ToolOutput, Tool, ToolRunOptions
 
+from common.async_cache import cache_async
+
 from ..http_utils import aiohttp_session
+from ..redis_utils import current_redis_client
 
 
 logger = logging.getLogger(__name__)
@@ -44,63 +48,151 @@ class ResultsDbResult(BaseModel):
     last_updated: datetime
 
 
-# Arbitrary limit, we shouldn't get this many results for a single NVR
-MAX_RESULTS = 100
+RESULTS_PAGE_SIZE = 100
 
+# Outcomes that will be replaced by another result once the test finishes
+IN_PROGRESS_OUTCOMES = {
+    ResultsdbOutput.QUEUED,
+    ResultsdbOutput.PENDING,
+    ResultsdbOutput.RUNNING,
+}
 
-async def search_resultsdb(
+# Search results are cached in Redis, when available, along with the submit
+# time of the latest result for the build at the time. The cached results are
+# only used while that is unchanged, so new results (e.g., from rerunning
+# failed tests) are always seen. While some tests are still in progress, we
+# also only cache briefly; once all outcomes are final, the results are kept
+# until the build is long gone.
+RESULTS_CACHE_KEY_PREFIX = "supervisor_resultsdb:"
+RESULTS_CACHE_IN_PROGRESS_TTL = 5 * 60  # seconds
+RESULTS_CACHE_FINAL_TTL = 30 * 24 * 60 * 60  # seconds
+
+
+class CachedResults(BaseModel):
+    latest_submit_time: datetime | None
+    results: list[ResultsDbResult]
+
+
+async def _get_resultsdb_pages(url: str) -> AsyncGenerator[list[Any], None]:
+    session = aiohttp_session()
+    next_url: str | None = url
+    while next_url is not None:
+        logger.info("Fetching resultsdb data from %s", next_url)
+        async with session.get(next_url) as response:
+            if response.status != 200:
+                text = await response.text()
+                raise client_exceptions.ClientResponseError(
+                    response.request_info,
+                    response.history,
+                    status=response.status,
+                    message=text,
+                    headers=response.headers,
+                )
+            response_json = await response.json()
+
+        yield response_json.get("data", [])
+        next_url = response_json.get("next")
+
+
+async def _fetch_resultsdb(
     package_nvr: str, name_pattern: str
 ) -> list[ResultsDbResult]:
-    session = aiohttp_session()
     url = (
         f"{RESULTS_DB_URL}/api/v2.0/results"
         f"?item={urlquote(package_nvr)}"
         f"&testcases:like={urlquote(name_pattern)}"
-        f"&limit={MAX_RESULTS}"
+        f"&limit={RESULTS_PAGE_SIZE}"
     )
-    logger.info("Fetching resultsdb data from %s", url)
-    async with session.get(url) as response:
-        if response.status == 200:
-            response_json = await response.json()
-
-            if response_json.get("next") is not None:
-                raise ValueError(f"ResultsDB returned more than {MAX_RESULTS} results")
 
-            results: list[ResultsDbResult] = [
-                ResultsDbResult(
-                    testcase_name=r["testcase"]["name"],
-                    outcome=ResultsdbOutput(r["outcome"]),
-                    ref_url=r["ref_url"],
-                    last_updated=datetime.fromisoformat(r["submit_time"]),
-                )
-                for r in response_json.get("data", [])
-            ]
-
-            # Now only keep the latest result for each testcase
-            latest_results: dict[str, ResultsDbResult] = {}
-            for r in results:
-                if (
-                    r.testcase_name not in latest_results
-                    or r.last_updated > latest_results[r.testcase_name].last_updated
-                ):
-                    latest_results[r.testcase_name] = r
-
-            logger.info(
-                "Found %d results in resultsdb (%d after filtering for latest submissions)",
-                len(results),
-                len(latest_results),
+    # Only keep the latest result for each testcase, as the pages come in
+    latest_results: dict[str, ResultsDbResult] = {}
+    count = 0
+    async for page in _get_resultsdb_pages(url):
+        for r in page:
+            result = ResultsDbResult(
+                testcase_name=r["testcase"]["name"],
+                outcome=ResultsdbOutput(r["outcome"]),
+                ref_url=r["ref_url"],
+                last_updated=datetime.fromisoformat(r["submit_time"]),
             )
+            latest = latest_results.get(result.testcase_name)
+            if latest is None or result.last_updated > latest.last_updated:
+                latest_results[result.testcase_name] = result
+        count += len(page)
+
+    logger.info(
+        "Found %d results in resultsdb (%d after filtering for latest submissions)",
+        count,
+        len(latest_results),
+    )
+
+    return list(latest_results.values())
 
-            return list(latest_results.values())
-        else:
-            text = await response.text()
-            raise client_exceptions.ClientResponseError(
-                response.request_info,
-                response.history,
-                status=response.status,
-                message=text,
-                headers=response.headers,
+
+# In addition to the cache in Redis, the same search is often done several
+# times in quick succession (by analyze_resultsdb() and then the agent);
+# not long enough to use stale results.
+@cache_async(max_age=60, max_entries=256)
+async def search_resultsdb(
+    package_nvr: str, name_pattern: str
+) -> list[ResultsDbResult]:
+    client = current_redis_client()
+    if client is None:
+        return await _fetch_resultsdb(package_nvr, name_pattern)
+
+    cache_key = f"{RESULTS_CACHE_KEY_PREFIX}{package_nvr}:{name_pattern}"
+    latest_submit_time = await get_latest_submit_time(package_nvr)
+    cached_data = await client.get(cache_key)
+    cached: CachedResults | None = None
+    if cached_data is not None:
+        try:
+            cached = CachedResults.model_validate_json(cached_data)
+        except ValidationError:
+            logger.debug(
+                "Discarding invalid cached resultsdb data for %s",
+                cache_key,
+                exc_info=True,
             )
+            await client.delete(cache_key)
+    if cached is not None and cached.latest_submit_time == latest_submit_time:
+        logger.debug("Using cached resultsdb data for %s", cache_key)
+        return cached.results
+
+    # Fetched after latest_submit_time, so nothing newer can be missed
+    results = await _fetch_resultsdb(package_nvr, name_pattern)
+
+    in_progress = any(r.outcome in IN_PROGRESS_OUTCOMES for r in results)
+    await client.set(
+        cache_key,
+        CachedResults(
+            latest_submit_time=latest_submit_time, results=results
+        ).model_dump_json(),
+        # No results yet is also a state that will change soon
+        ex=(
+            RESULTS_CACHE_IN_PROGRESS_TTL
+            if in_progress or not results
+            else RESULTS_CACHE_FINAL_TTL
+        ),
+    )
+
+    return results
+
+
+async def get_latest_submit_time(package_nvr: str) -> datetime | None:
+    """
+    Returns when the most recent result for package_nvr was submitted to
+    resultsdb, or None if there are no results. This is a cheap way to
+    tell whether anything has changed.
+    """
+    session = aiohttp_session()
+    # Results are returned newest first
+    url = f"{RESULTS_DB_URL}/api/v2.0/results?item={urlquote(package_nvr)}&limit=1"
+    async with session.get(url) as response:
+        response.raise_for_status()
+        response_json = await response.json()
+
+    data = response_json.get("data", [])
+    return datetime.fromisoformat(data[0]["submit_time"]) if data else None
 
 
 class SearchResultsdbInput(BaseModel):
@@ -1,19 +1,72 @@
 import asyncio
+from collections import deque
 from contextlib import asynccontextmanager
 from enum import StrEnum
+import logging
+import os
+import re
+import socket
 import time
 from typing import AsyncGenerator, Iterable, cast
+from uuid import uuid4
+import zlib
+from opentelemetry import metrics
 from pydantic import BaseModel
 import redis.asyncio as redis
 
 from common.utils import redis_client, fix_await
 
+logger = logging.getLogger(__name__)
+
+meter = metrics.get_meter(__name__)
+
+queue_items_gauge = meter.create_gauge(
+    "supervisor.work_queue.items",
+    unit="{item}",
+    description="Number of work items in the queue, by priority and state (ready or deferred)",
+)
+oldest_ready_age_gauge = meter.create_gauge(
+    "supervisor.work_queue.oldest_ready_age",
+    unit="s",
+    description="How long the oldest ready work item has been waiting, by priority",
+)
+pickup_lag_histogram = meter.create_histogram(
+    "supervisor.work_queue.pickup_lag",
+    unit="s",
+    description="Time between a work item becoming ready and being popped",
+)
+processing_duration_histogram = meter.create_histogram(
+    "supervisor.work_queue.processing_duration",
+    unit="s",
+    description="Time between a work item being popped and processing completing",
+)
+reschedule_delay_histogram = meter.create_histogram(
+    "supervisor.work_queue.reschedule_delay",
+    unit="s",
+    description="Delay with which work items are (re)scheduled",
+)
+
 
 class WorkItemType(StrEnum):
     PROCESS_ISSUE = "process_issue"
     PROCESS_ERRATUM = "process_erratum"
 
 
+class WorkItemPriority(StrEnum):
+    """
+    Priority classes for work items. Ready items of a higher priority are
+    always popped before ready items of a lower priority; within a priority
+    class, items are popped in the order they became ready.
+    """
+
+    HIGH = "high"
+    NORMAL = "normal"
+
+
+# In order from highest to lowest priority
+PRIORITIES = [WorkItemPriority.HIGH, WorkItemPriority.NORMAL]
+
+
 class WorkItem(BaseModel, frozen=True):
     item_type: WorkItemType
     item_data: str
@@ -21,91 +74,648 @@ class WorkItem(BaseModel, frozen=True):
     def __str__(self):
         return f"{self.item_type}:{self.item_data}"
 
+    @property
+    def priority(self) -> WorkItemPriority:
+        # Errata are typically blocking a release, so they get handled first
+        if self.item_type == WorkItemType.PROCESS_ERRATUM:
+            return WorkItemPriority.HIGH
+        else:
+            return WorkItemPriority.NORMAL
+
+    @property
+    def shard_hash(self) -> int:
+        # Must be stable across processes, so we can't use hash()
+        return zlib.crc32(self.item_data.encode())
+
     @staticmethod
     def from_str(item_str: str) -> "WorkItem":
         item_type, item_data = item_str.split(":", 1)
         return WorkItem(item_type=WorkItemType(item_type), item_data=item_data)
 
 
-FIRST_READY_SCRIPT = """
-local key = KEYS[1]
+class WorkItemLease(BaseModel):
+    """
+    A work item that has been popped from the queue. While the lease is held,
+    the score of the item in the queue is the lease expiry time, so that no
+    other processor will pick it up until the lease expires.
+    """
+
+    work_item: WorkItem
+    priority: WorkItemPriority
+    shard: int
+    ready_at: float
+    popped_at: float
+    expires_at: float
+
+
+# Each priority class of each shard is a separate sorted set, keyed by
+# ready time. The normal priority lane of shard 0 uses the historical key
+# name, so an unsharded queue is compatible with older versions.
+WORK_QUEUE_KEY = "supervisor_work_queue"
+
+
+def lane_key(priority: WorkItemPriority, shard: int = 0) -> str:
+    key = WORK_QUEUE_KEY if shard == 0 else f"{WORK_QUEUE_KEY}:shard{shard}"
+    if priority == WorkItemPriority.NORMAL:
+        return key
+    else:
+        return f"{key}:{priority}"
+
+
+# Matches the lane keys of shards other than 0, see lane_key()
+SHARD_LANE_KEY_RE = re.compile(
+    rf"^{WORK_QUEUE_KEY}:shard(\d+)(?::({'|'.join(PRIORITIES)}))?$"
+)
+
+
+# Pops up to maxItems ready items, leasing them until newScore. KEYS are the
+# lanes from highest to lowest priority, in groups of ARGV[4] lanes (one per
+# owned shard) of the same priority. Within a priority, the oldest items of
+# all shards are popped first. Returns a list of {lane index, member, old score}
+# triples.
+READY_SCRIPT = """
 local maxScore = tonumber(ARGV[1])
 local newScore = tonumber(ARGV[2])
+local remaining = tonumber(ARGV[3])
+local groupSize = tonumber(ARGV[4])
+
+local result = {}
+for first = 1, #KEYS, groupSize do
+    if remaining <= 0 then
+        break
+    end
+
+    -- The oldest items of each shard are the only candidates for the oldest
+    -- items of the whole priority
+    local candidates = {}
+    for lane = first, first + groupSize - 1 do
+        local res = redis.call(
+            "ZRANGEBYSCORE", KEYS[lane], "-inf", maxScore,
+            "WITHSCORES", "LIMIT", 0, remaining
+        )
+        for i = 1, #res, 2 do
+            table.insert(candidates, {lane, res[i], res[i + 1], tonumber(res[i + 1])})
+        end
+    end
 
-local res = redis.call("ZRANGE", key, 0, 0, "WITHSCORES")
+    table.sort(candidates, function(a, b)
+        if a[4] ~= b[4] then
+            return a[4] < b[4]
+        end
+        if a[1] ~= b[1] then
+            return a[1] < b[1]
+        end
+        return a[2] < b[2]
+    end)
 
-if #res == 0 then
-    return nil
+    for i = 1, math.min(remaining, #candidates) do
+        local lane, member, score = candidates[i][1], candidates[i][2], candidates[i][3]
+        redis.call("ZADD", KEYS[lane], newScore, member)
+        table.insert(result, {lane, member, score})
+    end
+
+    remaining = remaining - math.min(remaining, #candidates)
+end
+
+return result
+"""
+
+# Adds or updates members, returning the ones that weren't already present.
+# (ZADD only returns a count.) KEYS are all the lanes of all shards, and
+# ARGV[3:] are pairs of {lane index, member}. A member that is in a different
+# lane is moved to the new lane. With ARGV[1] == "NX", existing members are
+# left untouched.
+SCHEDULE_SCRIPT = """
+local nx = ARGV[1] == "NX"
+local score = tonumber(ARGV[2])
+
+local added = {}
+for i = 3, #ARGV, 2 do
+    local lane = tonumber(ARGV[i])
+    local member = ARGV[i + 1]
+
+    local present = false
+    for other, key in ipairs(KEYS) do
+        if other ~= lane and redis.call("ZSCORE", key, member) then
+            present = true
+            if not nx then
+                redis.call("ZREM", key, member)
+            end
+        end
+    end
+
+    if not (nx and present) then
+        local res
+        if nx then
+            res = redis.call("ZADD", KEYS[lane], "NX", score, member)
+        else
+            res = redis.call("ZADD", KEYS[lane], score, member)
+        end
+        if res == 1 and not present then
+            table.insert(added, member)
+        end
+    end
 end
 
-local member = res[1]
-local score = tonumber(res[2])
+return added
+"""
+
+# Changes the score of a leased item, but only if the lease is still held,
+# as identified by the score being the expiry time of our lease.
+UPDATE_LEASE_SCRIPT = """
+local key = KEYS[1]
+local member = ARGV[1]
+local expectedScore = tonumber(ARGV[2])
+local newScore = tonumber(ARGV[3])
 
-if score <= maxScore then
+local score = redis.call("ZSCORE", key, member)
+if score and tonumber(score) == expectedScore then
     redis.call("ZADD", key, newScore, member)
-    return {member, score}
+    return 1
 else
-    return nil
+    return 0
 end
 """
 
-POLLING_INTERVAL = 1 * 60  # 1 minute
+# A popped work item is hidden from other processors for LEASE_DURATION;
+# while it is being processed, the lease is extended every HEARTBEAT_INTERVAL,
+# so if a processor dies, its work items become ready again quickly.
+LEASE_DURATION = 60  # seconds
+HEARTBEAT_INTERVAL = 15  # seconds
+
+# If processing a work item fails, it is retried after WORK_ITEM_RETRY_DELAY,
+# doubling for each consecutive failure up to WORK_ITEM_MAX_RETRY_DELAY, so
+# that an item that always fails doesn't starve the rest of the queue. The
+# number of consecutive failures of each item is kept in this hash.
 WORK_ITEM_RETRY_DELAY = 15 * 60  # 15 minutes in seconds
+WORK_ITEM_MAX_RETRY_DELAY = 4 * 60 * 60  # 4 hours in seconds
+FAILURES_KEY = "supervisor_work_queue_failures"
+
+# When a work item is scheduled, we push a token onto this list; processors
+# waiting for work block on it (BLPOP) rather than polling the sorted set.
+# Using a list rather than pub/sub means that a wakeup that happens between
+# checking the queue and starting to wait isn't lost.
+WAKEUP_KEY = "supervisor_work_queue_wakeup"
+# Upper limit on outstanding wakeup tokens - extra tokens just cause spurious
+# wakeups, so there's no point in letting the list grow without bound.
+MAX_WAKEUP_TOKENS = 100
+# Safety net in case the queue is modified without a wakeup being
+# sent (e.g., by hand via redis-commander)
+MAX_WAIT = 10 * 60  # 10 minutes
+
+
+def wakeup_key(shard: int) -> str:
+    return WAKEUP_KEY if shard == 0 else f"{WAKEUP_KEY}:shard{shard}"
+
+
+# When the queue is sharded, each processor registers itself here, scored by
+# the time of its last heartbeat. The shards are divided between the live
+# processors, so when processors come and go, the shards are rebalanced.
+PROCESSORS_KEY = "supervisor_processors"
+MEMBERSHIP_INTERVAL = 15  # seconds
+MEMBERSHIP_TIMEOUT = 60  # seconds
 
 
 class WorkQueue:
-    def __init__(self, client: redis.Redis):
+    def __init__(self, client: redis.Redis, n_shards: int = 1):
         self.client = client
-        self.first_ready_script = client.register_script(FIRST_READY_SCRIPT)
+        self.n_shards = n_shards
+        self.processor_id = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        # Without sharding, we process everything; otherwise, the shards are
+        # assigned by maintain_shard_membership()
+        self.owned_shards: list[int] = [0] if n_shards == 1 else []
+        self.ready_script = client.register_script(READY_SCRIPT)
+        self.update_lease_script = client.register_script(UPDATE_LEASE_SCRIPT)
+        self.schedule_script = client.register_script(SCHEDULE_SCRIPT)
+        # Leases for work items currently being processed within this process.
+        # If the heartbeat falls behind (e.g., because the event loop was blocked),
+        # we can pop an item that we are still working on; this lets us notice.
+        self.claimed_work_items: dict[WorkItem, WorkItemLease] = {}
+        # Work items popped from Redis but not yet handed out to a worker.
+        # We pop as many items at once as there are workers waiting, so
+        # items don't sit here for long.
+        self.ready_buffer: deque[WorkItemLease] = deque()
+        self.waiting_workers = 0
+        self.refill_lock = asyncio.Lock()
+
+    async def pop_ready_work_items(self, max_items: int) -> list[WorkItemLease]:
+        """
+        Atomically pops and leases up to max_items ready work items from the
+        shards owned by this processor, highest priority first.
+        """
+        lanes = [
+            (priority, shard) for priority in PRIORITIES for shard in self.owned_shards
+        ]
+        if len(lanes) == 0:
+            return []
 
-    async def pop_first_ready_work_item(self) -> WorkItem | None:
         current_time = time.time()
+        expires_at = current_time + LEASE_DURATION
         result = cast(
-            None | tuple[bytes, float],
+            list[tuple[int, bytes, bytes]],
             await fix_await(
-                self.first_ready_script(
-                    keys=["supervisor_work_queue"],
-                    args=[current_time, current_time + WORK_ITEM_RETRY_DELAY],
+                self.ready_script(
+                    keys=[lane_key(priority, shard) for priority, shard in lanes],
+                    args=[
+                        current_time,
+                        expires_at,
+                        max_items,
+                        len(self.owned_shards),
+                    ],
                 )
             ),
         )
-        if result is None:
-            return None
 
-        return WorkItem.from_str(result[0].decode())
+        leases = [
+            WorkItemLease(
+                work_item=WorkItem.from_str(member.decode()),
+                priority=lanes[lane - 1][0],
+                shard=lanes[lane - 1][1],
+                ready_at=float(score),
+                popped_at=current_time,
+                expires_at=expires_at,
+            )
+            for lane, member, score in result
+        ]
+        for lease in leases:
+            pickup_lag_histogram.record(
+                current_time - lease.ready_at, {"priority": str(lease.priority)}
+            )
+
+        return leases
+
+    async def _update_lease(self, lease: WorkItemLease, new_score: float) -> bool:
+        result = await fix_await(
+            self.update_lease_script(
+                keys=[lane_key(lease.priority, lease.shard)],
+                args=[str(lease.work_item), lease.expires_at, new_score],
+            )
+        )
+        return result == 1
 
-    async def wait_first_ready_work_item(self) -> WorkItem:
-        while True:
-            work_item = await self.pop_first_ready_work_item()
-            if work_item is not None:
-                return work_item
-            await asyncio.sleep(POLLING_INTERVAL)
+    async def extend_lease(self, lease: WorkItemLease) -> bool:
+        """
+        Extends the lease by LEASE_DURATION from now. Returns False if
+        the lease was lost - the item was rescheduled or removed.
+        """
+        expires_at = time.time() + LEASE_DURATION
+        if await self._update_lease(lease, expires_at):
+            lease.expires_at = expires_at
+            return True
+        else:
+            return False
+
+    async def release_lease(self, lease: WorkItemLease, delay: float = 0.0) -> None:
+        """
+        Makes the work item ready again after delay seconds, if we still hold
+        the lease.
+        """
+        if await self._update_lease(lease, time.time() + delay) and delay <= 0:
+            await self._wake_waiters(lease.shard, 1)
+
+    async def _record_failure(self, work_item: WorkItem) -> float:
+        """
+        Counts a failure to process work_item, and returns the delay after
+        which it should be retried.
+        """
+        failures = await fix_await(self.client.hincrby(FAILURES_KEY, str(work_item), 1))
+        return min(
+            WORK_ITEM_RETRY_DELAY * 2 ** (failures - 1), WORK_ITEM_MAX_RETRY_DELAY
+        )
+
+    async def get_next_ready_time(self) -> float | None:
+        """
+        Returns the time at which the earliest item in the shards owned by this
+        processor becomes ready, or None if they are empty.
+        """
+        async with self.client.pipeline(transaction=False) as pipe:
+            for priority in PRIORITIES:
+                for shard in self.owned_shards:
+                    pipe.zrange(lane_key(priority, shard), 0, 0, withscores=True)
+            results = await pipe.execute()
+
+        scores = [result[0][1] for result in results if len(result) > 0]
+        return min(scores, default=None)
+
+    def _take_buffered_work_item(self) -> WorkItemLease | None:
+        while self.ready_buffer:
+            lease = self.ready_buffer.popleft()
+            existing = self.claimed_work_items.get(lease.work_item)
+            if existing is not None:
+                # Leave it for the worker that is already processing it,
+                # but take over the new lease, since the old one is gone.
+                existing.expires_at = lease.expires_at
+            elif lease.expires_at <= time.time():
+                # Another processor may have picked it up already
+                pass
+            else:
+                return lease
+
+        return None
+
+    async def wait_first_ready_work_item(self) -> WorkItemLease:
+        """
+        Wait until a work item is ready, then pop it. We sleep until either
+        the earliest item in the queue becomes ready, or until we are woken
+        up by schedule_work_items().
+
+        When called from multiple workers concurrently, only one of them talks
+        to Redis at a time, popping enough items for all the waiting workers.
+        """
+        self.waiting_workers += 1
+        try:
+            while True:
+                lease = self._take_buffered_work_item()
+                if lease is not None:
+                    return lease
+
+                async with self.refill_lock:
+                    if self.ready_buffer:
+                        continue
+
+                    leases = await self.pop_ready_work_items(self.waiting_workers)
+                    if leases:
+                        self.ready_buffer.extend(leases)
+                        continue
+
+                    # If the shard assignment changes, we need to notice
+                    max_wait = MAX_WAIT if self.n_shards == 1 else MEMBERSHIP_INTERVAL
+                    next_ready_time = await self.get_next_ready_time()
+                    if next_ready_time is None:
+                        timeout = max_wait
+                    else:
+                        timeout = min(max(next_ready_time - time.time(), 0), max_wait)
+
+                    if len(self.owned_shards) == 0:
+                        await asyncio.sleep(timeout)
+                    elif timeout > 0:
+                        await fix_await(
+                            self.client.blpop(
+                                [wakeup_key(shard) for shard in self.owned_shards],
+                                timeout=timeout,
+                            )
+                        )
+        finally:
+            self.waiting_workers -= 1
+
+    @asynccontextmanager
+    async def claim_first_ready_work_item(self) -> AsyncGenerator[WorkItem, None]:
+        """
+        Wait for a ready work item, and hold a lease on it for the duration of
+        the block, so that no other worker will pick it up. If the block raises
+        an exception, the item is retried after a delay that grows with each
+        consecutive failure; if we are cancelled (e.g., on shutdown), the lease
+        is released so that the item can be picked up again right away.
+        """
+        lease = await self.wait_first_ready_work_item()
+        work_item = lease.work_item
+        self.claimed_work_items[work_item] = lease
+
+        async def heartbeat():
+            while True:
+                await asyncio.sleep(HEARTBEAT_INTERVAL)
+                if not await self.extend_lease(lease):
+                    # Expected if the item was rescheduled or removed
+                    logger.debug("Lease on work item %s no longer held", work_item)
+                    return
+
+        heartbeat_task = asyncio.create_task(heartbeat())
+        outcome = "error"
+        try:
+            yield work_item
+            outcome = "ok"
+        except Exception:
+            heartbeat_task.cancel()
+            delay = await self._record_failure(work_item)
+            logger.info("Retrying work item %s in %d seconds", work_item, delay)
+            await self.release_lease(lease, delay)
+            raise
+        except BaseException:
+            heartbeat_task.cancel()
+            await self.release_lease(lease)
+            raise
+        else:
+            await fix_await(self.client.hdel(FAILURES_KEY, str(work_item)))
+        finally:
+            heartbeat_task.cancel()
+            del self.claimed_work_items[work_item]
+            processing_duration_histogram.record(
+                time.time() - lease.popped_at,
+                {"item_type": str(work_item.item_type), "outcome": outcome},
+            )
 
     async def schedule_work_items(
-        self, work_items: Iterable[WorkItem], delay: float = 0.0
-    ) -> None:
+        self,
+        work_items: Iterable[WorkItem],
+        delay: float = 0.0,
+        *,
+        only_new: bool = False,
+        priority: WorkItemPriority | None = None,
+    ) -> list[WorkItem]:
+        """
+        Schedules the work items to be ready after delay seconds. If only_new is
+        True, work items that are already in the queue are left untouched.
+        If priority is not specified, each item's default priority is used.
+
+        Returns the work items that weren't previously in the queue.
+        """
         new_time = time.time() + delay
-        to_add = {str(item): new_time for item in work_items}
+        to_add = set(work_items)
         if len(to_add) == 0:
-            return
+            return []
 
-        await self.client.zadd("supervisor_work_queue", to_add)
+        # We pass all lanes of all shards to the script, so that an item is
+        # never in the queue twice. (If the number of shards is reduced, items
+        # in the shards that no longer exist are only seen again once
+        # migrate_removed_shards() has moved them.)
+        all_lanes = self._all_lanes()
+        lane_args: list[int | str] = []
+        for item in to_add:
+            item_priority = priority if priority is not None else item.priority
+            lane = (item_priority, self.shard_for(item))
+            lane_args += [all_lanes.index(lane) + 1, str(item)]
+
+        added = cast(
+            list[bytes],
+            await fix_await(
+                self.schedule_script(
+                    keys=[lane_key(priority, shard) for priority, shard in all_lanes],
+                    args=["NX" if only_new else "", new_time, *lane_args],
+                )
+            ),
+        )
+
+        if not only_new:
+            for item in to_add:
+                reschedule_delay_histogram.record(
+                    delay, {"item_type": str(item.item_type)}
+                )
+
+        # Waiters are only woken up for items that are ready now. Items that
+        # become ready later are noticed when a waiter's timeout expires, which
+        # is at most MAX_WAIT later (see wait_first_ready_work_item()).
+        added_items = [WorkItem.from_str(member.decode()) for member in added]
+        if delay <= 0:
+            changed = added_items if only_new else to_add
+            changed_per_shard: dict[int, int] = {}
+            for item in changed:
+                shard = self.shard_for(item)
+                changed_per_shard[shard] = changed_per_shard.get(shard, 0) + 1
+            for shard, count in changed_per_shard.items():
+                await self._wake_waiters(shard, count)
+
+        return added_items
+
+    async def _wake_waiters(self, shard: int, count: int) -> None:
+        key = wakeup_key(shard)
+        n_tokens = min(count, MAX_WAKEUP_TOKENS)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.rpush(key, *([time.time()] * n_tokens))
+            pipe.ltrim(key, -MAX_WAKEUP_TOKENS, -1)
+            await pipe.execute()
+
+    def shard_for(self, work_item: WorkItem) -> int:
+        return work_item.shard_hash % self.n_shards
+
+    def _all_lanes(self) -> list[tuple[WorkItemPriority, int]]:
+        return [
+            (priority, shard)
+            for priority in PRIORITIES
+            for shard in range(self.n_shards)
+        ]
+
+    async def update_shard_membership(self) -> None:
+        """
+        Registers this processor as live, and recomputes which shards it owns.
+        Shards are assigned round-robin over the live processors in sorted
+        order, so every processor computes the same assignment. During a
+        rebalance, two processors may briefly both own a shard, but that is
+        harmless, since work items are leased when popped.
+        """
+        now = time.time()
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.zadd(PROCESSORS_KEY, {self.processor_id: now})
+            pipe.zremrangebyscore(PROCESSORS_KEY, "-inf", now - MEMBERSHIP_TIMEOUT)
+            pipe.zrange(PROCESSORS_KEY, 0, -1)
+            _, _, members = await pipe.execute()
+
+        processors = sorted(m.decode() for m in members)
+        rank = processors.index(self.processor_id)
+        owned_shards = [
+            shard for shard in range(self.n_shards) if shard % len(processors) == rank
+        ]
+        if owned_shards != self.owned_shards:
+            logger.info(
+                "Processor %s (%d of %d) now owns shards %s",
+                self.processor_id,
+                rank + 1,
+                len(processors),
+                owned_shards,
+            )
+            self.owned_shards = owned_shards
+
+    async def maintain_shard_membership(self) -> None:
+        """
+        Calls update_shard_membership() every MEMBERSHIP_INTERVAL, until
+        cancelled. If that fails, we keep the shards we have and try again
+        later; if it keeps failing, the other processors will consider us
+        dead and take over our shards.
+        """
+        try:
+            while True:
+                try:
+                    await self.update_shard_membership()
+                except Exception:
+                    logger.exception("Error while updating shard membership")
+                await asyncio.sleep(MEMBERSHIP_INTERVAL)
+        finally:
+            self.owned_shards = []
+            await self.client.zrem(PROCESSORS_KEY, self.processor_id)
+
+    async def migrate_removed_shards(self) -> None:
+        """
+        Moves work items from the lanes of shards that no longer exist,
+        because the number of shards was reduced, to their current lanes.
+        Items keep their scores (ready times).
+        """
+        async for key_bytes in self.client.scan_iter(
+            match=f"{WORK_QUEUE_KEY}:shard*", _type="ZSET"
+        ):
+            key = key_bytes.decode()
+            match = SHARD_LANE_KEY_RE.match(key)
+            if match is None or int(match.group(1)) < self.n_shards:
+                continue
+
+            priority = WorkItemPriority(match.group(2) or WorkItemPriority.NORMAL)
+            members = await self.client.zrange(key, 0, -1, withscores=True)
+            if len(members) == 0:
+                continue
+
+            logger.info("Moving %d work items out of %s", len(members), key)
+            per_lane: dict[str, dict[bytes, float]] = {}
+            changed_per_shard: dict[int, int] = {}
+            for member, score in members:
+                shard = self.shard_for(WorkItem.from_str(member.decode()))
+                per_lane.setdefault(lane_key(priority, shard), {})[member] = score
+                changed_per_shard[shard] = changed_per_shard.get(shard, 0) + 1
+
+            async with self.client.pipeline(transaction=True) as pipe:
+                for new_key, mapping in per_lane.items():
+                    # If an item is already in its new lane, that is more current
+                    pipe.zadd(new_key, mapping, nx=True)
+                pipe.zrem(key, *(member for member, _ in members))
+                await pipe.execute()
+
+            for shard, count in changed_per_shard.items():
+                await self._wake_waiters(shard, count)
 
     async def remove_work_items(self, work_items: Iterable[WorkItem]) -> None:
         to_remove = [str(item) for item in work_items]
         if len(to_remove) == 0:
             return
 
-        await self.client.zrem("supervisor_work_queue", *to_remove)
+        async with self.client.pipeline(transaction=True) as pipe:
+            for priority, shard in self._all_lanes():
+                pipe.zrem(lane_key(priority, shard), *to_remove)
+            pipe.hdel(FAILURES_KEY, *to_remove)
+            await pipe.execute()
 
-    async def get_all_work_items(self) -> list[WorkItem]:
-        work_items = await self.client.zrange("supervisor_work_queue", 0, -1)
-        return [
-            WorkItem.from_str(str(item_bytes.decode())) for item_bytes in work_items
-        ]
+    async def update_metrics(self) -> None:
+        """
+        Updates the queue depth and age gauges from the current queue contents.
+        """
+        now = time.time()
+        all_lanes = self._all_lanes()
+        async with self.client.pipeline(transaction=False) as pipe:
+            for priority, shard in all_lanes:
+                key = lane_key(priority, shard)
+                pipe.zcard(key)
+                pipe.zcount(key, "-inf", now)
+                pipe.zrange(key, 0, 0, withscores=True)
+            results = await pipe.execute()
+
+        for priority in PRIORITIES:
+            total = ready = 0
+            oldest_ready_age = 0.0
+            for i, lane in enumerate(all_lanes):
+                if lane[0] != priority:
+                    continue
+                lane_total, lane_ready, first = results[3 * i : 3 * i + 3]
+                total += lane_total
+                ready += lane_ready
+                if lane_ready > 0:
+                    oldest_ready_age = max(oldest_ready_age, now - first[0][1])
+
+            attributes = {"priority": str(priority)}
+            queue_items_gauge.set(ready, attributes | {"state": "ready"})
+            # This includes items that are leased because they are being processed
+            queue_items_gauge.set(total - ready, attributes | {"state": "deferred"})
+            oldest_ready_age_gauge.set(oldest_ready_age, attributes)
 
 
 @asynccontextmanager
 async def work_queue(redis_url: str) -> AsyncGenerator[WorkQueue, None]:
+    # The collector and all processors must agree on the number of shards
+    n_shards = int(os.environ.get("SUPERVISOR_QUEUE_SHARDS", "1"))
     async with redis_client(redis_url) as client:
-        yield WorkQueue(client)
+        yield WorkQueue(client, n_shards=n_shards)